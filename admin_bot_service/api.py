@@ -1,24 +1,48 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import uvicorn
-from aiogram import Bot
 import config
 from database import SessionLocal, TelegramMessage, TelegramUser, Channel, Setting
+from export import EXPORT_FORMATS, EXPORT_MEDIA_TYPES, stream_export
+from internal_auth import require_internal_token, verify_internal_token
+from logging_config import setup_logging
+import profiling
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("admin_api.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
-app = FastAPI(title="Admin Bot Internal API")
-bot = Bot(token=config.BOT_TOKEN)
+router = APIRouter()
+_bot = None
+
+def get_bot():
+    """Bot для уведомлений создается при первом уведомлении, поэтому импорт модуля не требует BOT_TOKEN."""
+    global _bot
+    if _bot is None:
+        from admin_bot_service.bot_factory import create_bot
+        _bot = create_bot()
+    return _bot
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Создаем Bot при старте приложения, чтобы импорт aiogram не лег на первый запрос
+    bot = get_bot()
+    yield
+    await bot.session.close()
+
+def create_app() -> FastAPI:
+    """Фабрика приложения: uvicorn --factory admin_bot_service.api:create_app"""
+    app = FastAPI(title="Admin Bot Internal API", lifespan=lifespan)
+    app.include_router(router)
+    # Профилирование доступно только с токеном внутреннего API: приложение может быть публичным (webhook)
+    app.include_router(
+        profiling.create_profiling_router(dependencies=[Depends(require_internal_token)]), prefix="/debug"
+    )
+    return app
 
 class OwnerNotification(BaseModel):
     message_text: str
@@ -27,7 +51,8 @@ class OwnerNotification(BaseModel):
     original_link: str | None = None
     owner_status: str # Should be "OWNER"
 
-@app.post("/notify_owner")
+@router.post("/notify_owner", dependencies=[Depends(verify_internal_token)])
+@profiling.timed("notify_owner")
 async def notify_owner_endpoint(data: OwnerNotification):
     """
     Endpoint для получения уведомлений от Aggregator Service о подтвержденных собственниках.
@@ -42,18 +67,78 @@ async def notify_owner_endpoint(data: OwnerNotification):
         notification_text += f"**Оригинал:** [Сообщение в канале]({data.original_link})\n"
 
     try:
-        await bot.send_message(config.ADMIN_CHAT_ID, notification_text, parse_mode="Markdown")
+        await get_bot().send_message(config.ADMIN_CHAT_ID, notification_text, parse_mode="Markdown")
         logger.info(f"Admin notified about new owner: {data.username or data.author_id}")
         return {"status": "success", "message": "Admin notified"}
     except Exception as e:
         logger.error(f"Failed to send notification to admin chat {config.ADMIN_CHAT_ID}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to send notification: {e}")
 
-async def start_admin_api():
+@router.get("/export", dependencies=[Depends(require_internal_token)])
+def export_endpoint(
+    format: str = "csv",
+    status: list[str] | None = Query(default=None),
+    channel_id: list[int] | None = Query(default=None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after_id: int | None = None,
+):
+    """
+    Потоковая выгрузка объявлений с авторами. Строки упорядочены по id,
+    для продолжения прерванной выгрузки передайте after_id последней полученной строки.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}. Expected one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401 - проверяем заранее, пока заголовки ответа еще не отправлены
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    chunks = stream_export(
+        format,
+        statuses=status,
+        channel_ids=channel_id,
+        since=since,
+        until=until,
+        after_id=after_id,
+    )
+    # Синхронный генератор Starlette читает в threadpool, не блокируя event loop
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="export.{format}"'},
+    )
+
+def register_webhook(app: FastAPI, dp, admin_bot):
+    """
+    Добавляет в приложение endpoint для апдейтов Telegram (режим webhook админ-бота).
+    """
+    async def telegram_webhook_endpoint(
+        request: Request,
+        x_telegram_bot_api_secret_token: str | None = Header(default=None),
+    ):
+        # Секрет обязателен: endpoint публичный, а иначе любой мог бы прислать апдейт от имени ADMIN_CHAT_ID
+        if not config.WEBHOOK_SECRET or not hmac.compare_digest(
+            (x_telegram_bot_api_secret_token or "").encode(), config.WEBHOOK_SECRET.encode()
+        ):
+            raise HTTPException(status_code=403, detail="Invalid secret token")
+        update = await request.json()
+        await dp.feed_webhook_update(admin_bot, update)
+        return {"ok": True}
+
+    app.add_api_route(config.WEBHOOK_PATH, telegram_webhook_endpoint, methods=["POST"], include_in_schema=False)
+    logger.info(f"Telegram webhook endpoint registered at {config.WEBHOOK_PATH}")
+
+async def start_admin_api(app: FastAPI | None = None):
+    import uvicorn
+
+    if app is None:
+        app = create_app()
     config_uvicorn = uvicorn.Config(app, host=config.ADMIN_BOT_API_HOST, port=config.ADMIN_BOT_API_PORT, log_level="info")
     server = uvicorn.Server(config_uvicorn)
     logger.info(f"Admin Bot Internal API started on {config.ADMIN_BOT_API_HOST}:{config.ADMIN_BOT_API_PORT}")
     await server.serve()
 
 if __name__ == "__main__":
+    setup_logging("admin_api.log")
     asyncio.run(start_admin_api())
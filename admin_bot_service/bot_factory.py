@@ -0,0 +1,27 @@
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+import config
+
+
+def create_bot(**kwargs) -> Bot:
+    """Создает Bot; если задан TELEGRAM_API_SERVER, запросы идут на локальный сервер/заглушку."""
+    if config.TELEGRAM_API_SERVER:
+        kwargs.setdefault(
+            "session",
+            AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_SERVER)),
+        )
+    return Bot(token=config.BOT_TOKEN, **kwargs)
+
+
+def create_storage() -> BaseStorage:
+    """Хранилище FSM: память процесса или общий Redis для нескольких реплик."""
+    if config.FSM_STORAGE == "redis":
+        # Импорт здесь, чтобы redis был нужен только при FSM_STORAGE=redis
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(config.REDIS_URL)
+    if config.FSM_STORAGE != "memory":
+        raise ValueError(f"Unknown FSM_STORAGE: {config.FSM_STORAGE!r} (expected 'memory' or 'redis')")
+    return MemoryStorage()
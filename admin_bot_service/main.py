@@ -1,30 +1,34 @@
 import asyncio
-from aiogram import Bot, Dispatcher, types
+import hashlib
+import html
+import re
+from datetime import datetime, timezone
+import httpx
+from aiogram import Bot, Dispatcher, Router, types
+from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from sqlalchemy import func, not_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 import config
 from database import SessionLocal, Channel, Setting
+from admin_bot_service.bot_factory import create_bot, create_storage
+from logging_config import setup_logging
+import profiling
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("admin_bot.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=config.BOT_TOKEN, parse_mode=ParseMode.HTML)
-dp = Dispatcher(storage=MemoryStorage())
-
 # State for adding channels
 class ChannelForm(StatesGroup):
     waiting_for_channel_id = State()
+    waiting_for_channel_list = State()
 
 # State for changing welcome text
 class WelcomeTextForm(StatesGroup):
@@ -39,14 +43,28 @@ async def db_session_middleware(handler, event, data):
     finally:
         db.close()
 
-dp.message.middleware(db_session_middleware) # Применяем middleware
-
-@dp.message(lambda message: message.chat.id != config.ADMIN_CHAT_ID)
 async def handle_non_admin_messages(message: types.Message):
     """Отвечаем на сообщения от неадминов."""
     await message.reply("Извините, этот бот предназначен только для администраторов.")
 
-@dp.message(commands=["start"])
+def _is_admin_callback(callback_query: types.CallbackQuery) -> bool:
+    """
+    Кнопка должна быть нажата под сообщением из чата админа. В личном чате (ADMIN_CHAT_ID > 0)
+    нажать может только сам админ, в группе - любой ее участник.
+    """
+    message = callback_query.message
+    if message is None or message.chat.id != config.ADMIN_CHAT_ID:
+        return False
+    return config.ADMIN_CHAT_ID < 0 or callback_query.from_user.id == config.ADMIN_CHAT_ID
+
+async def handle_non_admin_callbacks(callback_query: types.CallbackQuery):
+    """Callback не из чата админа (в т.ч. подделанный) ничего не меняет."""
+    await callback_query.answer("Извините, этот бот предназначен только для администраторов.", show_alert=True)
+
+async def handle_stale_callbacks(callback_query: types.CallbackQuery):
+    """Кнопки старого формата или без обработчика: убираем "часики" и подсказываем обновить список."""
+    await callback_query.answer("Кнопка устарела, откройте /channels заново.")
+
 async def command_start_handler(message: types.Message):
     """Обрабатывает команду /start."""
     text = (
@@ -54,39 +72,221 @@ async def command_start_handler(message: types.Message):
         "Я бот для поиска собственников недвижимости.\n"
         "Доступные команды:\n"
         "/channels - Управление каналами для мониторинга\n"
+        "/channels &lt;текст&gt; - Поиск канала по названию или ID\n"
         "/text - Изменить текст приветственного сообщения\n"
+        "/profile [on|off|sample N|cprofile N] - Профилирование агрегатора\n"
         "/status - Получить статус агрегатора (в разработке)\n"
         "/stop - Остановить агрегатор (в разработке)\n"
     )
     await message.answer(text)
 
-@dp.message(commands=["channels"])
-async def command_channels_handler(message: types.Message, db: SessionLocal):
-    """Показывает список каналов и предлагает добавить/удалить."""
-    channels = db.query(Channel).all()
+CHANNELS_PAGE_SIZE = 20
+CHANNEL_FILTERS = {"all": "Все", "active": "🟢 Активные", "inactive": "🔴 Неактивные"}
+MAX_IMPORT_FILE_SIZE = 1024 * 1024 # Файл со списком ID, 1 МБ более чем достаточно
+CHANNEL_SEARCHES_LIMIT = 100 # Сколько последних поисков чата помнить для кнопок
+
+# Кнопки списка несут область выборки (фильтр:id поиска), поэтому не зависят от FSM нажавшего
+_SCOPE = r"(?:all|active|inactive):[0-9a-f]*"
+
+def _callback_data(pattern: str):
+    """Фильтр callback_query: data целиком совпадает с pattern."""
+    compiled = re.compile(pattern)
+    return lambda c: c.data is not None and compiled.fullmatch(c.data) is not None
+
+def _channel_conditions(status_filter: str, search: str | None) -> list:
+    """Условия выборки каналов для текущего фильтра и поиска."""
+    conditions = []
+    if status_filter == "active":
+        conditions.append(Channel.is_active.is_(True))
+    elif status_filter == "inactive":
+        conditions.append(Channel.is_active.is_(False))
+    if search:
+        search_condition = Channel.title.ilike(f"%{search}%")
+        if search.lstrip("-").isdigit():
+            search_condition = or_(search_condition, Channel.telegram_id == int(search))
+        conditions.append(search_condition)
+    return conditions
+
+def _channel_searches(fsm_storage: BaseStorage, bot: Bot, chat_id: int) -> FSMContext:
+    """
+    Тексты поиска по каналам, общие для всех админов чата: в callback_data кладется только короткий id.
+    Отдельный destiny, чтобы не пересекаться с FSM-состоянием пользователя (в личке chat_id == user_id).
+    """
+    key = StorageKey(bot_id=bot.id, chat_id=chat_id, user_id=chat_id, destiny="channel_searches")
+    return FSMContext(storage=fsm_storage, key=key)
+
+async def _remember_search(searches: FSMContext, search: str | None) -> str:
+    if not search:
+        return ""
+    search_id = hashlib.sha1(search.encode()).hexdigest()[:8]
+    data = await searches.get_data()
+    if data.get(search_id) != search:
+        data.pop(search_id, None)
+        data[search_id] = search
+        # Самые старые поиски вытесняются, их кнопки станут "устаревшими"
+        await searches.set_data(dict(list(data.items())[-CHANNEL_SEARCHES_LIMIT:]))
+    return search_id
+
+async def _callback_scope(callback_query: types.CallbackQuery, fsm_storage: BaseStorage, status_filter: str, search_id: str):
+    """Восстанавливает (фильтр, поиск) из кнопки. None - поиск уже забыт, пользователю показан alert."""
+    if not search_id:
+        return status_filter, None
+    searches = _channel_searches(fsm_storage, callback_query.bot, callback_query.message.chat.id)
+    search = (await searches.get_data()).get(search_id)
+    if search is None:
+        await callback_query.answer("Список устарел, откройте /channels заново.", show_alert=True)
+        return None
+    return status_filter, search
+
+def _parse_channel_ids(raw_text: str) -> tuple[list[int], list[str]]:
+    """Делит текст по пробелам/запятым: целые числа - ID каналов, остальное - отклоненные токены."""
+    telegram_ids, rejected = set(), []
+    for token in re.split(r"[\s,]+", raw_text):
+        if not token:
+            continue
+        if re.fullmatch(r"-?\d+", token):
+            telegram_ids.add(int(token))
+        else:
+            rejected.append(token)
+    return sorted(telegram_ids), rejected
+
+def _insert_missing_channels(db: SessionLocal, rows: list[dict]) -> int:
+    """Один INSERT ... ON CONFLICT DO NOTHING на весь список; SQLite (локально и в тестах) понимает ту же конструкцию."""
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    stmt = insert(Channel).values(rows).on_conflict_do_nothing(index_elements=[Channel.telegram_id])
+    return db.execute(stmt).rowcount
+
+def _load_channel_page(db: SessionLocal, conditions: list, after_id: int) -> tuple[list, bool]:
+    """Keyset-пагинация по Channel.id: одна страница + признак наличия следующей."""
+    rows = (
+        db.query(Channel)
+        .filter(*conditions, Channel.id > after_id)
+        .order_by(Channel.id)
+        .limit(CHANNELS_PAGE_SIZE + 1)
+        .all()
+    )
+    return rows[:CHANNELS_PAGE_SIZE], len(rows) > CHANNELS_PAGE_SIZE
+
+def _previous_page_anchor(db: SessionLocal, conditions: list, first_id: int) -> int:
+    """Находит after_id, с которого начинается страница перед first_id."""
+    ids = [
+        row.id for row in db.query(Channel.id)
+        .filter(*conditions, Channel.id < first_id)
+        .order_by(Channel.id.desc())
+        .limit(CHANNELS_PAGE_SIZE)
+    ]
+    return min(ids) - 1 if ids else 0
+
+async def _edit_or_answer(message: types.Message, text: str, keyboard: types.InlineKeyboardMarkup, edit: bool):
+    if edit:
+        try:
+            await message.edit_text(text, reply_markup=keyboard)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+    else:
+        await message.answer(text, reply_markup=keyboard)
+
+def _scope_title(status_filter: str, search: str | None) -> str:
+    title = CHANNEL_FILTERS[status_filter]
+    if search:
+        title += f", поиск: <code>{html.escape(search)}</code>"
+    return title
+
+async def show_channels_page(
+    message: types.Message,
+    db: SessionLocal,
+    status_filter: str = "all",
+    search: str | None = None,
+    search_id: str = "",
+    after_id: int = 0,
+    edit: bool = False,
+):
+    """Показывает страницу каналов для фильтра и поиска; область выборки зашивается в кнопки."""
+    scope = f"{status_filter}:{search_id}"
+    conditions = _channel_conditions(status_filter, search)
+
+    channels, has_next = _load_channel_page(db, conditions, after_id)
+    total = db.query(func.count(Channel.id)).filter(*conditions).scalar()
+    has_prev = bool(channels) and db.query(Channel.id).filter(*conditions, Channel.id < channels[0].id).first() is not None
+
+    header = f"<b>Мониторинг каналов</b> ({_scope_title(status_filter, search)}, всего: {total})\n"
     if not channels:
-        response = "Пока нет добавленных каналов."
+        response = header + "Каналы не найдены."
     else:
-        response = "<b>Мониторинг каналов:</b>\n"
+        lines = []
         for ch in channels:
-            status = "🟢 Активен" if ch.is_active else "🔴 Неактивен"
-            response += f"- <code>{ch.telegram_id}</code>: {ch.title} ({status})\n"
-    
-    keyboard = types.InlineKeyboardMarkup(
-        inline_keyboard=[
-            [types.InlineKeyboardButton(text="➕ Добавить канал", callback_data="add_channel")],
-            [types.InlineKeyboardButton(text="✏️ Изменить статус канала", callback_data="toggle_channel_status")]
-        ]
-    )
-    await message.answer(response, reply_markup=keyboard)
+            status = "🟢" if ch.is_active else "🔴"
+            lines.append(f"{status} <code>{ch.telegram_id}</code>: {html.escape(ch.title[:60])}")
+        response = header + "\n".join(lines)
+
+    # Кнопки переключения несут anchor страницы, чтобы после изменения перерисовать ту же страницу
+    keyboard_buttons = [
+        [types.InlineKeyboardButton(
+            text=f"{'🟢' if ch.is_active else '🔴'} {ch.title[:40]} ({ch.telegram_id})",
+            callback_data=f"chtgl:{ch.telegram_id}:{after_id}:{scope}",
+        )]
+        for ch in channels
+    ]
+    navigation = []
+    if has_prev:
+        navigation.append(types.InlineKeyboardButton(text="⬅️ Назад", callback_data=f"chprev:{channels[0].id}:{scope}"))
+    if has_next:
+        navigation.append(types.InlineKeyboardButton(text="Вперед ➡️", callback_data=f"chpage:{channels[-1].id}:{scope}"))
+    if navigation:
+        keyboard_buttons.append(navigation)
+    keyboard_buttons.append([
+        types.InlineKeyboardButton(text=title, callback_data=f"chflt:{key}:{search_id}")
+        for key, title in CHANNEL_FILTERS.items() if key != status_filter
+    ])
+    if total:
+        keyboard_buttons.append([
+            types.InlineKeyboardButton(text=f"🟢 Активировать все ({total})", callback_data=f"chbulk:on:{scope}"),
+            types.InlineKeyboardButton(text=f"🔴 Деактивировать все ({total})", callback_data=f"chbulk:off:{scope}"),
+        ])
+    keyboard_buttons.append([
+        types.InlineKeyboardButton(text="➕ Добавить канал", callback_data="add_channel"),
+        types.InlineKeyboardButton(text="📥 Импорт списка", callback_data="chimport"),
+    ])
+    await _edit_or_answer(message, response, types.InlineKeyboardMarkup(inline_keyboard=keyboard_buttons), edit)
+
+async def command_channels_handler(message: types.Message, db: SessionLocal, fsm_storage: BaseStorage):
+    """Показывает постраничный список каналов. /channels <текст> ищет по названию или ID."""
+    parts = (message.text or "").split(maxsplit=1)
+    search = parts[1].strip() if len(parts) > 1 else None
+    search_id = await _remember_search(_channel_searches(fsm_storage, message.bot, message.chat.id), search)
+    await show_channels_page(message, db, search=search, search_id=search_id)
+
+async def callback_channels_next_page(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    _, after_id, status_filter, search_id = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
+    await callback_query.answer()
+    await show_channels_page(callback_query.message, db, *scope, search_id, after_id=int(after_id), edit=True)
+
+async def callback_channels_prev_page(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    _, first_id, status_filter, search_id = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
+    await callback_query.answer()
+    after_id = _previous_page_anchor(db, _channel_conditions(*scope), int(first_id))
+    await show_channels_page(callback_query.message, db, *scope, search_id, after_id=after_id, edit=True)
+
+async def callback_channels_filter(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    _, status_filter, search_id = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
+    await callback_query.answer()
+    await show_channels_page(callback_query.message, db, *scope, search_id, edit=True)
 
-@dp.callback_query(lambda c: c.data == "add_channel")
 async def callback_add_channel(callback_query: types.CallbackQuery, state: FSMContext):
     await callback_query.answer()
     await callback_query.message.answer("Пожалуйста, введите ID или ссылку на канал (например, <code>@channel_username</code> или <code>-1001234567890</code>):")
     await state.set_state(ChannelForm.waiting_for_channel_id)
 
-@dp.message(ChannelForm.waiting_for_channel_id)
 async def process_channel_id(message: types.Message, state: FSMContext, db: SessionLocal):
     channel_input = message.text.strip()
     # Здесь нужно было бы получить Telegram ID канала по username/ссылке
@@ -119,43 +319,128 @@ async def process_channel_id(message: types.Message, state: FSMContext, db: Sess
         await message.answer(f"Произошла ошибка при добавлении канала: {e}")
     finally:
         await state.clear()
-        await command_channels_handler(message, db) # Показать обновленный список
+        await show_channels_page(message, db) # Показать обновленный список
 
-
-@dp.callback_query(lambda c: c.data == "toggle_channel_status")
-async def callback_toggle_channel_status(callback_query: types.CallbackQuery, db: SessionLocal):
+async def callback_import_channels(callback_query: types.CallbackQuery, state: FSMContext):
     await callback_query.answer()
-    channels = db.query(Channel).all()
-    if not channels:
-        await callback_query.message.answer("Нет каналов для изменения статуса.")
+    await callback_query.message.answer(
+        "Вставьте список числовых ID каналов (через пробел, запятую или с новой строки) "
+        "или пришлите текстовый файл с ними:"
+    )
+    await state.set_state(ChannelForm.waiting_for_channel_list)
+
+async def process_channel_list(message: types.Message, state: FSMContext, db: SessionLocal):
+    if message.document:
+        if message.document.file_size and message.document.file_size > MAX_IMPORT_FILE_SIZE:
+            await message.answer("Файл слишком большой (максимум 1 МБ).")
+            return
+        file = await message.bot.download(message.document)
+        raw_text = file.read().decode("utf-8", errors="ignore")
+    else:
+        raw_text = message.text or ""
+
+    telegram_ids, rejected = _parse_channel_ids(raw_text)
+    rejected_text = ""
+    if rejected:
+        shown = ", ".join(f"<code>{html.escape(token[:40])}</code>" for token in rejected[:20])
+        more = f" и еще {len(rejected) - 20}" if len(rejected) > 20 else ""
+        rejected_text = f"\nПропущено (не числовой ID): {len(rejected)} - {shown}{more}"
+    if not telegram_ids:
+        await message.answer("Не нашел ни одного числового ID. Попробуйте еще раз." + rejected_text)
         return
 
-    keyboard_buttons = []
-    for ch in channels:
-        status_text = "🟢 Активен" if ch.is_active else "🔴 Неактивен"
-        keyboard_buttons.append(
-            [types.InlineKeyboardButton(text=f"{ch.title} ({ch.telegram_id}) - {status_text}", callback_data=f"toggle_channel_{ch.telegram_id}")]
+    try:
+        # Уже существующие каналы пропускаются
+        now = datetime.now(timezone.utc)
+        added = _insert_missing_channels(db, [
+            {"telegram_id": telegram_id, "title": f"Канал {telegram_id}", "is_active": True, "created_at": now}
+            for telegram_id in telegram_ids
+        ])
+        db.commit()
+        await message.answer(
+            f"Импорт завершен: добавлено {added}, уже были в базе {len(telegram_ids) - added}."
+            + rejected_text
         )
-    
-    keyboard = types.InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback_query.message.answer("Выберите канал для изменения статуса:", reply_markup=keyboard)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error importing {len(telegram_ids)} channels: {e}", exc_info=True)
+        await message.answer(f"Произошла ошибка при импорте каналов: {e}")
+    await state.clear()
+    await show_channels_page(message, db)
 
-@dp.callback_query(lambda c: c.data.startswith("toggle_channel_"))
-async def callback_toggle_channel_status_confirm(callback_query: types.CallbackQuery, db: SessionLocal):
+async def _show_bulk_prompt(message: types.Message, db: SessionLocal, action: str, status_filter: str, search: str | None, search_id: str, edit: bool = False):
+    """Спрашивает подтверждение; кнопка несет область выборки и число каналов, которое увидел админ."""
+    is_active = action == "on"
+    conditions = _channel_conditions(status_filter, search)
+    affected = db.query(func.count(Channel.id)).filter(*conditions, Channel.is_active.isnot(is_active)).scalar()
+    if not affected:
+        await _edit_or_answer(message, "Изменять нечего: все каналы уже в этом статусе.", None, edit)
+        return
+    action_text = "Активировать" if is_active else "Деактивировать"
+    keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
+        types.InlineKeyboardButton(
+            text=f"✅ {action_text} ({affected})",
+            callback_data=f"chbulk:{action}:confirm:{status_filter}:{search_id}:{affected}",
+        ),
+        types.InlineKeyboardButton(text="❌ Отмена", callback_data="chbulk:cancel"),
+    ]])
+    await _edit_or_answer(
+        message,
+        f"{action_text} каналов: {affected} ({_scope_title(status_filter, search)}). Подтвердите действие.",
+        keyboard,
+        edit,
+    )
+
+async def callback_bulk_channel_status(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    """Перед массовым изменением спрашивает подтверждение с числом затрагиваемых каналов."""
+    _, action, status_filter, search_id = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
     await callback_query.answer()
-    channel_id = int(callback_query.data.split("_")[2])
-    channel = db.query(Channel).filter_by(telegram_id=channel_id).first()
+    await _show_bulk_prompt(callback_query.message, db, action, *scope, search_id)
 
-    if channel:
-        channel.is_active = not channel.is_active
-        db.commit()
-        status_text = "активирован" if channel.is_active else "деактивирован"
-        await callback_query.message.edit_text(f"Статус канала <b>{channel.title}</b> (<code>{channel.telegram_id}</code>) изменен на: {status_text}.", reply_markup=None)
-        await command_channels_handler(callback_query.message, db)
-    else:
-        await callback_query.message.answer("Канал не найден.")
+async def callback_bulk_channel_cancel(callback_query: types.CallbackQuery):
+    await callback_query.answer("Отменено.")
+    await callback_query.message.edit_text("Массовое изменение отменено.")
+
+async def callback_bulk_channel_confirm(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    _, action, _, status_filter, search_id, confirmed_count = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
+    is_active = action == "on"
+    to_change = db.query(Channel).filter(*_channel_conditions(*scope), Channel.is_active.isnot(is_active))
+    if to_change.count() != int(confirmed_count):
+        # Пока подтверждение висело, каналы добавились или поменяли статус - показываем новое число
+        await callback_query.answer("Список каналов изменился, подтвердите еще раз.", show_alert=True)
+        await _show_bulk_prompt(callback_query.message, db, action, *scope, search_id, edit=True)
+        return
+    # Один UPDATE по той же области, что была в подтверждении
+    updated = to_change.update({Channel.is_active: is_active}, synchronize_session=False)
+    db.commit()
+    status_text = "активировано" if is_active else "деактивировано"
+    await callback_query.answer(f"Каналов {status_text}: {updated}")
+    # Сообщение с подтверждением заменяем обновленным списком
+    await show_channels_page(callback_query.message, db, *scope, search_id, edit=True)
+
+async def callback_toggle_channel_status(callback_query: types.CallbackQuery, db: SessionLocal, fsm_storage: BaseStorage):
+    _, channel_id, after_id, status_filter, search_id = callback_query.data.split(":")
+    scope = await _callback_scope(callback_query, fsm_storage, status_filter, search_id)
+    if scope is None:
+        return
+    updated = (
+        db.query(Channel)
+        .filter(Channel.telegram_id == int(channel_id))
+        .update({Channel.is_active: not_(Channel.is_active)}, synchronize_session=False)
+    )
+    db.commit()
+    if not updated:
+        await callback_query.answer("Канал не найден.")
+        return
+    await callback_query.answer("Статус канала изменен.")
+    await show_channels_page(callback_query.message, db, *scope, search_id, after_id=int(after_id), edit=True)
 
-@dp.message(commands=["text"])
 async def command_text_handler(message: types.Message, state: FSMContext, db: SessionLocal):
     current_text_setting = db.query(Setting).filter_by(key="INITIAL_QUESTION_TEXT").first()
     current_text = current_text_setting.value if current_text_setting else config.INITIAL_QUESTION_TEXT
@@ -166,7 +451,6 @@ async def command_text_handler(message: types.Message, state: FSMContext, db: Se
     )
     await state.set_state(WelcomeTextForm.waiting_for_new_text)
 
-@dp.message(WelcomeTextForm.waiting_for_new_text)
 async def process_new_welcome_text(message: types.Message, state: FSMContext, db: SessionLocal):
     new_text = message.text.strip()
     if not new_text:
@@ -185,9 +469,136 @@ async def process_new_welcome_text(message: types.Message, state: FSMContext, db
     await message.answer("Текст приветственного сообщения обновлен!")
     await state.clear()
 
+def _format_profiling_status(status: dict) -> str:
+    lines = [f"<b>Профилирование агрегатора:</b> {'включено' if status['enabled'] else 'выключено'}"]
+    timings = sorted(status["timings"].items(), key=lambda item: item[1]["total_s"], reverse=True)
+    for name, stats in timings:
+        lines.append(
+            f"<code>{html.escape(name)}</code>: {stats['count']} вызовов, "
+            f"avg {stats['avg_ms']} мс, max {stats['max_ms']} мс"
+        )
+    if status["slow_callbacks"]:
+        lines.append(f"Блокировок event loop &gt; {status['slow_callback_threshold_ms']} мс: {len(status['slow_callbacks'])}")
+        for event in status["slow_callbacks"][-3:]:
+            still_blocked = " (еще идет)" if event.get("in_progress") else ""
+            lines.append(f"- {event['blocked_ms']} мс{still_blocked}: <code>{html.escape(' <- '.join(reversed(event['stack'][-3:])))}</code>")
+    return "\n".join(lines)
+
+async def command_profile_handler(message: types.Message):
+    """Управление профилированием агрегатора через его debug API."""
+    if not config.AGGREGATOR_DEBUG_PORT:
+        await message.answer("Debug API агрегатора выключен (AGGREGATOR_DEBUG_PORT не задан).")
+        return
+
+    args = message.text.split()[1:]
+    action = args[0] if args else "status"
+    try:
+        headers = {"Authorization": f"Bearer {config.ADMIN_API_TOKEN}"} if config.ADMIN_API_TOKEN else {}
+        async with httpx.AsyncClient(base_url=f"{config.AGGREGATOR_DEBUG_URL}/debug", headers=headers) as http_client:
+            if action in ("on", "off"):
+                response = await http_client.post("/profiling/enable" if action == "on" else "/profiling/disable")
+            elif action in profiling.CAPTURE_MODES:
+                seconds = float(args[1]) if len(args) > 1 else 10
+                await message.answer(f"Снимаю профиль ({action}) в течение {seconds:g} с...")
+                response = await http_client.post(
+                    "/profiling/capture",
+                    params={"mode": action, "seconds": seconds},
+                    timeout=seconds + 30,
+                )
+                response.raise_for_status()
+                filename = "aggregator.prof" if action == "cprofile" else "aggregator.folded"
+                await message.answer_document(types.BufferedInputFile(response.content, filename=filename))
+                return
+            elif action == "status":
+                response = await http_client.get("/profiling")
+            else:
+                await message.answer("Использование: /profile [on|off|sample N|cprofile N]")
+                return
+            response.raise_for_status()
+            await message.answer(_format_profiling_status(response.json()))
+    except ValueError:
+        await message.answer("Длительность должна быть числом секунд.")
+    except httpx.HTTPStatusError as e:
+        await message.answer(f"Debug API агрегатора вернул ошибку: {e.response.status_code} {html.escape(e.response.text)}")
+    except httpx.RequestError as e:
+        logger.error(f"Failed to reach aggregator debug API: {e}")
+        await message.answer(f"Не удалось связаться с debug API агрегатора: {html.escape(str(e))}")
+
+def create_router() -> Router:
+    """
+    Собирает роутер с хэндлерами админ-бота. Каждый вызов возвращает новый Router,
+    поэтому create_dispatcher() можно вызывать несколько раз (тесты, несколько ботов в процессе).
+    """
+    router = Router()
+    router.message.middleware(db_session_middleware)
+    router.callback_query.middleware(db_session_middleware)
+    # Порядок важен: первыми отсекаем сообщения и кнопки не от админа
+    router.message.register(handle_non_admin_messages, lambda message: message.chat.id != config.ADMIN_CHAT_ID)
+    router.callback_query.register(handle_non_admin_callbacks, lambda c: not _is_admin_callback(c))
+    router.message.register(command_start_handler, Command("start"))
+    router.message.register(command_channels_handler, Command("channels"))
+    router.callback_query.register(callback_channels_next_page, _callback_data(rf"chpage:\d+:{_SCOPE}"))
+    router.callback_query.register(callback_channels_prev_page, _callback_data(rf"chprev:\d+:{_SCOPE}"))
+    router.callback_query.register(callback_channels_filter, _callback_data(rf"chflt:{_SCOPE}"))
+    router.callback_query.register(callback_add_channel, lambda c: c.data == "add_channel")
+    router.message.register(process_channel_id, ChannelForm.waiting_for_channel_id)
+    router.callback_query.register(callback_import_channels, lambda c: c.data == "chimport")
+    router.message.register(process_channel_list, ChannelForm.waiting_for_channel_list)
+    router.callback_query.register(callback_bulk_channel_status, _callback_data(rf"chbulk:(?:on|off):{_SCOPE}"))
+    router.callback_query.register(callback_bulk_channel_cancel, lambda c: c.data == "chbulk:cancel")
+    router.callback_query.register(callback_bulk_channel_confirm, _callback_data(rf"chbulk:(?:on|off):confirm:{_SCOPE}:\d+"))
+    router.callback_query.register(callback_toggle_channel_status, _callback_data(rf"chtgl:-?\d+:\d+:{_SCOPE}"))
+    router.message.register(command_text_handler, Command("text"))
+    router.message.register(process_new_welcome_text, WelcomeTextForm.waiting_for_new_text)
+    router.message.register(command_profile_handler, Command("profile"))
+    router.callback_query.register(handle_stale_callbacks)
+    return router
+
+def create_dispatcher() -> Dispatcher:
+    dp = Dispatcher(storage=create_storage()) # При FSM_STORAGE=redis состояние переживает рестарт и общее для реплик
+    dp.include_router(create_router())
+    return dp
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Принимает апдейты через webhook на том же ASGI-приложении, что и внутренний API."""
+    # Импорт здесь, чтобы в режиме polling не тянуть FastAPI/uvicorn в процесс бота
+    from admin_bot_service import api
+
+    if not config.WEBHOOK_BASE_URL:
+        raise RuntimeError("WEBHOOK_BASE_URL must be set when ADMIN_BOT_USE_WEBHOOK is enabled")
+    if not config.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set when ADMIN_BOT_USE_WEBHOOK is enabled")
+    if not config.ADMIN_API_TOKEN:
+        # В режиме webhook внутренний API живет на публично доступном приложении
+        raise RuntimeError("ADMIN_API_TOKEN must be set when ADMIN_BOT_USE_WEBHOOK is enabled")
+
+    app = api.create_app()
+    api.register_webhook(app, dp, bot)
+    webhook_url = f"{config.WEBHOOK_BASE_URL.rstrip('/')}{config.WEBHOOK_PATH}"
+    # set_webhook идемпотентен, поэтому его безопасно вызывать из каждой реплики.
+    # Webhook не снимаем при остановке: остальные реплики продолжают принимать апдейты.
+    await bot.set_webhook(
+        webhook_url,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info(f"Webhook set to {webhook_url}")
+    await api.start_admin_api(app)
+
 async def main_admin_bot():
+    setup_logging("admin_bot.log")
     logger.info("Starting Admin Bot Service...")
-    await dp.start_polling(bot)
+    bot = create_bot(default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    dp = create_dispatcher()
+    try:
+        if config.ADMIN_BOT_USE_WEBHOOK:
+            await run_webhook(bot, dp)
+        else:
+            await bot.delete_webhook() # Telegram не отдает апдейты через getUpdates, пока установлен webhook
+            await dp.start_polling(bot)
+    finally:
+        await dp.storage.close()
+        await bot.session.close()
     logger.info("Admin Bot Service stopped.")
 
 if __name__ == "__main__":
@@ -4,93 +4,19 @@ from telethon.tl.types import ChannelParticipantsBots, ChannelParticipantsAdmins
 from telethon.errors import UserIsBlockedError, PeerFloodError, FloodWaitError, UserPrivacyRestrictedError, ChatWriteForbiddenError
 import time
 import random
-import httpx
 from datetime import datetime, timedelta, timezone
 
 import config
 from database import SessionLocal, Channel, TelegramMessage, TelegramUser
+from aggregator_service.pipeline import get_dm_rate_limiter, is_relevant_message, notify_admin_bot
+from logging_config import setup_logging
+import profiling
 # from aggregator_service.rate_limiter import RateLimiter # Для реального продакшна
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("aggregator.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-# Для простоты демонстрации, rate limiter будет in-memory. В продакшне лучше Redis.
-class InMemoryRateLimiter:
-    def __init__(self, limit_per_interval, interval_seconds):
-        self.limit_per_interval = limit_per_interval
-        self.interval_seconds = interval_seconds
-        self.timestamps = []
-        self.daily_count = 0
-        self.last_reset_day = datetime.now(timezone.utc).day
-
-    async def wait_if_needed(self):
-        now = datetime.now(timezone.utc)
-        if now.day != self.last_reset_day:
-            self.daily_count = 0
-            self.last_reset_day = now.day
-            logger.info("Daily DM count reset.")
-
-        if self.daily_count >= config.DAILY_DM_LIMIT_PER_ACCOUNT:
-            logger.warning(f"Daily DM limit ({config.DAILY_DM_LIMIT_PER_ACCOUNT}) reached. Waiting until next day.")
-            # Для простоты, ждем до полуночи следующего дня. В реале - другой механизм.
-            tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-            await asyncio.sleep((tomorrow - now).total_seconds())
-            self.daily_count = 0 # Reset for next day immediately
-            self.last_reset_day = tomorrow.day
-
-        self.timestamps = [t for t in self.timestamps if now - t < timedelta(seconds=self.interval_seconds)]
-        if len(self.timestamps) >= self.limit_per_interval:
-            wait_time = self.interval_seconds - (now - self.timestamps[0]).total_seconds()
-            if wait_time > 0:
-                logger.info(f"Rate limit hit. Waiting for {wait_time:.2f} seconds.")
-                await asyncio.sleep(wait_time)
-            self.timestamps = [t for t in self.timestamps if datetime.now(timezone.utc) - t < timedelta(seconds=self.interval_seconds)] # Re-evaluate after wait
-
-    def record_send(self):
-        self.timestamps.append(datetime.now(timezone.utc))
-        self.daily_count += 1
-        logger.info(f"DM sent. Total today: {self.daily_count}. Current window: {len(self.timestamps)}.")
-
-dm_rate_limiter = InMemoryRateLimiter(limit_per_interval=1, interval_seconds=random.randint(config.DM_SEND_INTERVAL_MIN, config.DM_SEND_INTERVAL_MAX))
-
-client = TelegramClient(
-    session=f"sessions/{config.PHONE_NUMBER}",  # Session file location
-    api_id=config.API_ID,
-    api_hash=config.API_HASH,
-)
-
-async def notify_admin_bot(message_data: dict):
-    """Отправляет уведомление админ-боту по внутреннему API."""
-    try:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(
-                f"{config.ADMIN_BOT_API_URL}/notify_owner", json=message_data
-            )
-            response.raise_for_status()
-            logger.info(f"Notification sent to admin bot: {message_data.get('username')}")
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Failed to notify admin bot (HTTP error): {e.response.status_code} - {e.response.text}")
-    except httpx.RequestError as e:
-        logger.error(f"Failed to notify admin bot (Request error): {e}")
-
-
-async def is_relevant_message(message_text: str) -> bool:
-    """Проверяет, является ли сообщение потенциальным объявлением о продаже."""
-    text_lower = message_text.lower()
-    for keyword in config.CHANNEL_FILTER_KEYWORDS:
-        if keyword in text_lower:
-            return True
-    return False
-
-@client.on(events.NewMessage)
+@profiling.timed("handle_new_message")
 async def handle_new_message(event):
     if not event.is_channel:
         return # Нас интересуют только сообщения в каналах
@@ -213,13 +139,16 @@ async def handle_new_message(event):
         db.refresh(new_msg) # Обновляем объект, чтобы получить ID
 
         # Отправляем DM
-        await dm_rate_limiter.wait_if_needed()
+        dm_rate_limiter = get_dm_rate_limiter()
+        # Паузы анти-бана считаются отдельно, иначе avg/max хэндлера показывают троттлинг, а не обработку
+        async with profiling.waiting("dm_rate_limit_wait"):
+            await dm_rate_limiter.wait_if_needed()
         try:
             # Для Telethon, при отправке сообщения пользователю, который не в контактах,
             # мы должны использовать его ID или username.
             # Если username нет, остаётся только ID.
             # `entity=author_id` попытается отправить по ID.
-            await client.send_message(
+            await event.client.send_message(
                 entity=author_id,
                 message=config.INITIAL_QUESTION_TEXT,
                 parse_mode='html' # Можно использовать HTML для форматирования
@@ -239,13 +168,15 @@ async def handle_new_message(event):
             new_msg.owner_status = "DM_FAILED_FLOOD"
             existing_user.dialog_state = "DM_FAILED"
             db.commit()
-            await asyncio.sleep(random.randint(300, 600)) # Большая пауза
+            async with profiling.waiting("dm_flood_pause"):
+                await asyncio.sleep(random.randint(300, 600)) # Большая пауза
         except FloodWaitError as e:
             logger.error(f"FloodWaitError: {e}. Waiting for {e.seconds} seconds.")
             new_msg.owner_status = "DM_FAILED_FLOOD_WAIT"
             existing_user.dialog_state = "DM_FAILED"
             db.commit()
-            await asyncio.sleep(e.seconds + 5) # Ждем немного больше
+            async with profiling.waiting("dm_flood_pause"):
+                await asyncio.sleep(e.seconds + 5) # Ждем немного больше
         except Exception as e:
             logger.error(f"Error sending DM to {author_id} for message {message_id}: {e}", exc_info=True)
             new_msg.owner_status = "DM_FAILED_GENERIC"
@@ -259,7 +190,7 @@ async def handle_new_message(event):
         db.close()
 
 
-@client.on(events.NewMessage(incoming=True, func=lambda e: e.is_private))
+@profiling.timed("handle_dm_reply")
 async def handle_dm_reply(event):
     """Обрабатывает ответы на личные сообщения."""
     sender_id = event.peer_id.user_id # ID пользователя, который ответил
@@ -335,7 +266,7 @@ async def handle_dm_reply(event):
         db.close()
 
 
-async def initialize_channels():
+async def initialize_channels(client: TelegramClient):
     """Загружает активные каналы из БД и присоединяется к ним."""
     db = SessionLocal()
     try:
@@ -361,16 +292,50 @@ async def initialize_channels():
         db.close()
 
 
+async def start_debug_api():
+    """Внутренний debug API агрегатора (профилирование), только если задан AGGREGATOR_DEBUG_PORT."""
+    # Импорт здесь, чтобы без debug API агрегатор не тянул FastAPI/uvicorn
+    import uvicorn
+    from fastapi import Depends, FastAPI
+    from internal_auth import require_internal_token
+
+    debug_app = FastAPI(title="Aggregator Debug API")
+    debug_app.include_router(
+        profiling.create_profiling_router(dependencies=[Depends(require_internal_token)]), prefix="/debug"
+    )
+    server = uvicorn.Server(uvicorn.Config(debug_app, host=config.AGGREGATOR_DEBUG_HOST, port=config.AGGREGATOR_DEBUG_PORT, log_level="warning"))
+    logger.info(f"Aggregator debug API started on {config.AGGREGATOR_DEBUG_HOST}:{config.AGGREGATOR_DEBUG_PORT}")
+    await server.serve()
+
+
+def create_client() -> TelegramClient:
+    """Создает клиент Telethon и регистрирует на нем обработчики."""
+    client = TelegramClient(
+        session=f"sessions/{config.PHONE_NUMBER}",  # Session file location
+        api_id=config.API_ID,
+        api_hash=config.API_HASH,
+    )
+    client.add_event_handler(handle_new_message, events.NewMessage)
+    client.add_event_handler(handle_dm_reply, events.NewMessage(incoming=True, func=lambda e: e.is_private))
+    return client
+
+
 async def main_aggregator():
+    setup_logging("aggregator.log")
     logger.info("Starting Aggregator Service...")
+    client = create_client()
     await client.start(phone=config.PHONE_NUMBER)
     logger.info("Telethon client started.")
 
-    await initialize_channels()
+    await initialize_channels(client)
+
+    debug_api_task = asyncio.create_task(start_debug_api()) if config.AGGREGATOR_DEBUG_PORT else None
 
     # Запускаем обработчики сообщений
     # Здесь можно добавить другие фоновые задачи, например, периодическую проверку новых каналов
     await client.run_until_disconnected()
+    if debug_api_task:
+        debug_api_task.cancel()
     logger.info("Aggregator Service stopped.")
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+import asyncio
+import random
+import httpx
+from datetime import datetime, timedelta, timezone
+import logging
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Для простоты демонстрации, rate limiter будет in-memory. В продакшне лучше Redis.
+class InMemoryRateLimiter:
+    def __init__(self, limit_per_interval, interval_seconds):
+        self.limit_per_interval = limit_per_interval
+        self.interval_seconds = interval_seconds
+        self.timestamps = []
+        self.daily_count = 0
+        self.last_reset_day = datetime.now(timezone.utc).day
+
+    async def wait_if_needed(self):
+        now = datetime.now(timezone.utc)
+        if now.day != self.last_reset_day:
+            self.daily_count = 0
+            self.last_reset_day = now.day
+            logger.info("Daily DM count reset.")
+
+        if self.daily_count >= config.DAILY_DM_LIMIT_PER_ACCOUNT:
+            logger.warning(f"Daily DM limit ({config.DAILY_DM_LIMIT_PER_ACCOUNT}) reached. Waiting until next day.")
+            # Для простоты, ждем до полуночи следующего дня. В реале - другой механизм.
+            tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            await asyncio.sleep((tomorrow - now).total_seconds())
+            self.daily_count = 0 # Reset for next day immediately
+            self.last_reset_day = tomorrow.day
+
+        self.timestamps = [t for t in self.timestamps if now - t < timedelta(seconds=self.interval_seconds)]
+        if len(self.timestamps) >= self.limit_per_interval:
+            wait_time = self.interval_seconds - (now - self.timestamps[0]).total_seconds()
+            if wait_time > 0:
+                logger.info(f"Rate limit hit. Waiting for {wait_time:.2f} seconds.")
+                await asyncio.sleep(wait_time)
+            self.timestamps = [t for t in self.timestamps if datetime.now(timezone.utc) - t < timedelta(seconds=self.interval_seconds)] # Re-evaluate after wait
+
+    def record_send(self):
+        self.timestamps.append(datetime.now(timezone.utc))
+        self.daily_count += 1
+        logger.info(f"DM sent. Total today: {self.daily_count}. Current window: {len(self.timestamps)}.")
+
+_dm_rate_limiter = None
+
+def get_dm_rate_limiter() -> InMemoryRateLimiter:
+    """Лимитер создается при первой отправке DM, а не при импорте."""
+    global _dm_rate_limiter
+    if _dm_rate_limiter is None:
+        _dm_rate_limiter = InMemoryRateLimiter(limit_per_interval=1, interval_seconds=random.randint(config.DM_SEND_INTERVAL_MIN, config.DM_SEND_INTERVAL_MAX))
+    return _dm_rate_limiter
+
+async def notify_admin_bot(message_data: dict):
+    """Отправляет уведомление админ-боту по внутреннему API."""
+    try:
+        async with httpx.AsyncClient() as http_client:
+            headers = {"Authorization": f"Bearer {config.ADMIN_API_TOKEN}"} if config.ADMIN_API_TOKEN else {}
+            response = await http_client.post(
+                f"{config.ADMIN_BOT_API_URL}/notify_owner", json=message_data, headers=headers
+            )
+            response.raise_for_status()
+            logger.info(f"Notification sent to admin bot: {message_data.get('username')}")
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Failed to notify admin bot (HTTP error): {e.response.status_code} - {e.response.text}")
+    except httpx.RequestError as e:
+        logger.error(f"Failed to notify admin bot (Request error): {e}")
+
+
+async def is_relevant_message(message_text: str) -> bool:
+    """Проверяет, является ли сообщение потенциальным объявлением о продаже."""
+    text_lower = message_text.lower()
+    for keyword in config.CHANNEL_FILTER_KEYWORDS:
+        if keyword in text_lower:
+            return True
+    return False
@@ -0,0 +1,135 @@
+"""
+Заглушка Telegram Bot API для нагрузочных тестов и локальной разработки.
+
+Отвечает на POST /bot<token>/<method> с настраиваемой задержкой, долей ошибок 500 и 429.
+Настройки меняются на лету через POST /_config, счетчики - GET /_stats и POST /_reset.
+Тексты доставленных sendMessage отдает GET /_delivered (для сверки с отправленными).
+Сервисы направляются сюда переменной TELEGRAM_API_SERVER=http://localhost:<port>.
+
+    python -m benchmarks.fake_bot_api --port 8081 --latency-ms 50 --rate-limit-rate 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class FakeBotApiSettings(BaseModel):
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0 # Доля ответов 500
+    rate_limit_rate: float = 0 # Доля ответов 429
+    retry_after: int = 1
+
+
+app = FastAPI(title="Fake Telegram Bot API")
+settings = FakeBotApiSettings()
+stats = Counter()
+delivered_texts = []
+_message_ids = itertools.count(1)
+_random = random.Random()
+
+
+def _fake_result(method: str):
+    if method.lower() == "sendmessage":
+        return {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": {"id": 0, "type": "private"},
+            "text": "",
+        }
+    return True
+
+
+@app.post("/bot{token}/{method}")
+async def bot_method_endpoint(token: str, method: str, request: Request):
+    stats["requests"] += 1
+    delay = settings.latency_ms + _random.uniform(-settings.jitter_ms, settings.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    roll = _random.random()
+    if roll < settings.rate_limit_rate:
+        stats["rate_limited"] += 1
+        return JSONResponse(status_code=429, content={
+            "ok": False,
+            "error_code": 429,
+            "description": f"Too Many Requests: retry after {settings.retry_after}",
+            "parameters": {"retry_after": settings.retry_after},
+        })
+    if roll < settings.rate_limit_rate + settings.error_rate:
+        stats["errors"] += 1
+        return JSONResponse(status_code=500, content={
+            "ok": False,
+            "error_code": 500,
+            "description": "Internal Server Error",
+        })
+
+    stats["delivered"] += 1
+    stats[f"delivered:{method}"] += 1
+    if method.lower() == "sendmessage":
+        # Без файлов aiogram шлет параметры как application/x-www-form-urlencoded
+        fields = parse_qs((await request.body()).decode())
+        delivered_texts.append(fields.get("text", [""])[0])
+    return {"ok": True, "result": _fake_result(method)}
+
+
+@app.get("/_delivered")
+async def delivered_endpoint():
+    return {"texts": delivered_texts}
+
+
+@app.get("/_stats")
+async def stats_endpoint():
+    return {"settings": settings.model_dump(), "stats": dict(stats)}
+
+
+@app.post("/_config")
+async def config_endpoint(new_settings: FakeBotApiSettings):
+    global settings
+    settings = new_settings
+    return settings.model_dump()
+
+
+@app.post("/_reset")
+async def reset_endpoint():
+    stats.clear()
+    delivered_texts.clear()
+    return {"status": "reset"}
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, help="Seed for reproducible error/latency patterns")
+    args = parser.parse_args(argv)
+
+    global settings
+    settings = FakeBotApiSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+    )
+    if args.seed is not None:
+        _random.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
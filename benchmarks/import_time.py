@@ -0,0 +1,92 @@
+"""
+Время импорта модулей проекта в чистом интерпретаторе.
+
+Каждый модуль импортируется в отдельном процессе с пустым окружением (без токенов и .env)
+во временном каталоге. Для каждого выводится медиана времени импорта, какие тяжелые пакеты
+он подтянул и не оставил ли импорт файлов (логов, сессий) - импорт должен быть без побочных эффектов.
+
+    python -m benchmarks.import_time --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "config",
+    "database",
+    "export",
+    "profiling",
+    "aggregator_service.pipeline",
+    "aggregator_service.main",
+    "admin_bot_service.api",
+    "admin_bot_service.main",
+]
+HEAVY_PACKAGES = ["telethon", "aiogram", "fastapi", "uvicorn", "sqlalchemy", "httpx", "redis", "pyarrow"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int) -> dict:
+    timings = []
+    loaded = []
+    created_files = set()
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": ROOT}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            completed = subprocess.run(
+                [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+                cwd=workdir, env=env, capture_output=True, text=True,
+            )
+            created_files.update(os.listdir(workdir))
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1]}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result["elapsed"])
+        loaded = result["loaded"]
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "loaded": loaded,
+        "created_files": sorted(created_files),
+    }
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Measure import time of project modules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--module", action="append", help="Module to measure, repeatable (default: all)")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = [measure_import(module, args.repeat) for module in args.module or MODULES]
+    print(f"{'module':<30}{'median ms':>11}{'min ms':>9}  heavy imports / side effects")
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<30}{'FAILED':>20}  {result['error']}")
+            continue
+        notes = ", ".join(result["loaded"]) or "-"
+        if result["created_files"]:
+            notes += f"; created files: {', '.join(result['created_files'])}"
+        print(f"{result['module']:<30}{result['median_ms']:>11}{result['min_ms']:>9}  {notes}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if any("error" in result or result["created_files"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Нагрузочный тест POST /notify_owner внутреннего API админ-бота.
+
+Поднимает заглушку Bot API (benchmarks/fake_bot_api.py) и admin API в отдельных процессах,
+прогоняет сценарии (нормальный Telegram, медленный, с ошибками 500, с 429) и для каждого
+выводит пропускную способность (все ответы и только успешные - goodput), перцентили задержки,
+долю ошибок и потерь.
+Ошибка - любой ответ кроме 200: отправитель знает о сбое и может повторить.
+Потеря - уведомление, о судьбе которого отправитель не узнал: API ответил 200, но в Bot API
+оно не дошло (acked_not_delivered, сверяется по номеру объявления), или запрос завершился таймаутом.
+
+    python -m benchmarks.notify_owner_load --requests 2000 --concurrency 50
+    python -m benchmarks.notify_owner_load --scenario rate_limited --json results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import secrets
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+SCENARIOS = {
+    "baseline": {"latency_ms": 30, "jitter_ms": 10},
+    "slow_telegram": {"latency_ms": 500, "jitter_ms": 200},
+    "flaky_telegram": {"latency_ms": 30, "jitter_ms": 10, "error_rate": 0.05},
+    "rate_limited": {"latency_ms": 30, "jitter_ms": 10, "rate_limit_rate": 0.1, "retry_after": 1},
+}
+
+
+NOTIFICATION_NUMBER_RE = re.compile(r"Объявление #(\d+)")
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _notification(number: int) -> dict:
+    return {
+        "message_text": f"Продажа квартиры, 2 комнаты, 54 м², цена 9 500 000 руб. Объявление #{number}",
+        "author_id": 100000 + number,
+        "username": f"load_test_{number}",
+        "original_link": f"https://t.me/c/1/{number}",
+        "owner_status": "OWNER",
+    }
+
+
+async def run_load(api_url: str, total_requests: int, concurrency: int, timeout: float, api_token: str | None = None) -> dict:
+    """Отправляет total_requests уведомлений из concurrency параллельных клиентов."""
+    latencies = []
+    outcomes = Counter()
+    acked = set()
+    numbers = itertools.count()
+
+    async def worker(http_client: httpx.AsyncClient):
+        while (number := next(numbers)) < total_requests:
+            started = time.perf_counter()
+            try:
+                response = await http_client.post("/notify_owner", json=_notification(number))
+                outcomes[str(response.status_code)] += 1
+                if response.status_code == 200:
+                    acked.add(number)
+            except httpx.TimeoutException:
+                outcomes["timeout"] += 1
+            except httpx.RequestError:
+                outcomes["connection_error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {api_token}"} if api_token else {}
+    async with httpx.AsyncClient(base_url=api_url, timeout=timeout, limits=limits, headers=headers) as http_client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(http_client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    succeeded = outcomes["200"]
+    return {
+        "sent": total_requests,
+        "succeeded": succeeded,
+        "acked": acked,
+        "outcomes": dict(outcomes),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 1) if elapsed else 0.0,
+        # Быстрые 500 поднимают throughput, поэтому отдельно - только успешные запросы
+        "goodput_rps": round(succeeded / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 1),
+            "p95": round(_percentile(latencies, 95) * 1000, 1),
+            "p99": round(_percentile(latencies, 99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "error_rate": round(1 - succeeded / total_requests, 4) if total_requests else 0.0,
+    }
+
+
+async def run_scenario(name: str, api_url: str, fake_api_url: str, api_token: str | None, args) -> dict:
+    async with httpx.AsyncClient(base_url=fake_api_url) as control:
+        (await control.post("/_config", json=SCENARIOS[name])).raise_for_status()
+        (await control.post("/_reset")).raise_for_status()
+        result = await run_load(api_url, args.requests, args.concurrency, args.timeout, api_token)
+        fake_stats = (await control.get("/_stats")).json()["stats"]
+        delivered_texts = (await control.get("/_delivered")).json()["texts"]
+
+    delivered_numbers = {
+        int(match.group(1)) for match in map(NOTIFICATION_NUMBER_RE.search, delivered_texts) if match
+    }
+    # 200 от API без доставки в Bot API - потерянное подтверждение, должно быть 0
+    acked_not_delivered = len(result.pop("acked") - delivered_numbers)
+    lost = acked_not_delivered + result["outcomes"].get("timeout", 0)
+    result["scenario"] = name
+    result["bot_api_calls"] = fake_stats.get("requests", 0)
+    result["delivered"] = len(delivered_numbers)
+    result["acked_not_delivered"] = acked_not_delivered
+    result["loss_rate"] = round(lost / result["sent"], 4) if result["sent"] else 0.0
+    return result
+
+
+def _start_process(args: list[str], env: dict, verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, *args], env=env, stdout=output, stderr=output)
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http_client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process for {url} exited with code {process.returncode} (rerun with --verbose to see its output)")
+            try:
+                await http_client.get(url)
+                return
+            except httpx.RequestError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready in {timeout} s")
+
+
+def _print_report(results: list[dict]):
+    header = f"{'scenario':<16}{'rps':>9}{'good rps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>9}{'acked!dlv':>11}{'loss':>9}  outcomes"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"{result['scenario']:<16}{result['throughput_rps']:>9}{result['goodput_rps']:>10}{latency['p50']:>9}{latency['p95']:>9}"
+            f"{latency['p99']:>9}{latency['max']:>9}{result['error_rate']:>9.2%}{result['acked_not_delivered']:>11}{result['loss_rate']:>9.2%}"
+            f"  {result['outcomes']}"
+        )
+
+
+async def main_load_test(args):
+    processes = []
+    fake_api_url = f"http://127.0.0.1:{args.fake_api_port}"
+    api_url = args.api_url
+    api_token = args.api_token
+    try:
+        processes.append(_start_process(
+            ["-m", "benchmarks.fake_bot_api", "--port", str(args.fake_api_port), "--seed", str(args.seed)],
+            dict(os.environ),
+            args.verbose,
+        ))
+        await _wait_ready(f"{fake_api_url}/_stats", processes[-1])
+
+        if not api_url:
+            api_url = f"http://127.0.0.1:{args.api_port}"
+            # Токен задаем явно: иначе API взял бы ADMIN_API_TOKEN из .env, а клиент его бы не знал
+            api_token = secrets.token_urlsafe(32)
+            env = dict(
+                os.environ,
+                BOT_TOKEN="123456:LOAD-TEST",
+                ADMIN_CHAT_ID="1",
+                TELEGRAM_API_SERVER=fake_api_url,
+                ADMIN_API_TOKEN=api_token,
+            )
+            processes.append(_start_process(
+                ["-m", "uvicorn", "--factory", "admin_bot_service.api:create_app", "--port", str(args.api_port),
+                 "--log-level", "warning", "--no-access-log"],
+                env,
+                args.verbose,
+            ))
+            await _wait_ready(f"{api_url}/openapi.json", processes[-1])
+
+        results = []
+        for name in args.scenario or SCENARIOS:
+            results.append(await run_scenario(name, api_url, fake_api_url, api_token, args))
+        _print_report(results)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Load test for the admin bot /notify_owner API")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Scenario to run, repeatable (default: all)")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout per request, seconds")
+    parser.add_argument("--api-url", help="Use an already running admin API instead of starting one (it must point TELEGRAM_API_SERVER at the fake API)")
+    parser.add_argument("--api-token", default=os.getenv("ADMIN_API_TOKEN"), help="Bearer token for --api-url (default: $ADMIN_API_TOKEN); a started API gets a generated one")
+    parser.add_argument("--api-port", type=int, default=18001)
+    parser.add_argument("--fake-api-port", type=int, default=18081)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show output of the started API processes")
+    asyncio.run(main_load_test(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
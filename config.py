@@ -1,63 +1,104 @@
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Telegram Bot API (для Admin Bot)
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0")) # ID чата или пользователя, куда слать уведомления
-
-# Telegram User API (для Aggregator Service)
-API_ID = int(os.getenv("API_ID", "0"))
-API_HASH = os.getenv("API_HASH")
-PHONE_NUMBER = os.getenv("PHONE_NUMBER") # Номер телефона аккаунта агрегатора
-
-# Database
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "telegram_owner_finder")
-
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-# Redis (опционально)
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
-
-# Internal API для Admin Bot (для уведомлений от Aggregator)
-ADMIN_BOT_API_HOST = os.getenv("ADMIN_BOT_API_HOST", "localhost")
-ADMIN_BOT_API_PORT = int(os.getenv("ADMIN_BOT_API_PORT", "8001"))
-ADMIN_BOT_API_URL = f"http://{ADMIN_BOT_API_HOST}:{ADMIN_BOT_API_PORT}"
-
-# Aggregator settings
-INITIAL_QUESTION_TEXT = os.getenv(
-    "INITIAL_QUESTION_TEXT",
-    "Здравствуйте! Подскажите, вы собственник квартиры или агент?",
-)
-OWNER_KEYWORDS = [
-    "собственник",
-    "хозяин",
-    "я",
-    "мой",
-    "мое",
-    "напрямую",
-    "сам",
-    "без посредников",
-]
-AGENT_KEYWORDS = ["агент", "посредник", "риелтор", "брокер", "не я", "нет"]
-CHANNEL_FILTER_KEYWORDS = [
-    "продажа",
-    "квартира",
-    "м²",
-    "цена",
-    "руб",
-    "собственник",
-    "без комиссии",
-]
-
-# Anti-ban settings
-DM_SEND_INTERVAL_MIN = int(os.getenv("DM_SEND_INTERVAL_MIN", "5")) # Минимальная задержка между DM в секундах
-DM_SEND_INTERVAL_MAX = int(os.getenv("DM_SEND_INTERVAL_MAX", "15")) # Максимальная задержка между DM в секундах
-DAILY_DM_LIMIT_PER_ACCOUNT = int(os.getenv("DAILY_DM_LIMIT_PER_ACCOUNT", "50")) # Дневной лимит DM с одного аккаунта
+
+_loaded = False
+
+
+def load(dotenv: bool = True):
+    """
+    Читает настройки из окружения (и из .env, если dotenv=True) в атрибуты модуля.
+    Вызывается сам при первом обращении к настройке, поэтому импорт config ничего не читает.
+    Уже присвоенные атрибуты (например, config.BOT_TOKEN = ... в тестах) не перезаписываются.
+    """
+    global _loaded
+    if dotenv:
+        from dotenv import load_dotenv
+        load_dotenv()
+
+    # Telegram Bot API (для Admin Bot)
+    BOT_TOKEN = os.getenv("BOT_TOKEN")
+    ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0")) # ID чата или пользователя, куда слать уведомления
+
+    # Telegram User API (для Aggregator Service)
+    API_ID = int(os.getenv("API_ID", "0"))
+    API_HASH = os.getenv("API_HASH")
+    PHONE_NUMBER = os.getenv("PHONE_NUMBER") # Номер телефона аккаунта агрегатора
+
+    # Database
+    DB_USER = os.getenv("DB_USER", "postgres")
+    DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
+    DB_HOST = os.getenv("DB_HOST", "localhost")
+    DB_PORT = os.getenv("DB_PORT", "5432")
+    DB_NAME = os.getenv("DB_NAME", "telegram_owner_finder")
+
+    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+    # Redis (опционально)
+    REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+    REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+    REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+    REDIS_URL = os.getenv("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
+
+    # Internal API для Admin Bot (для уведомлений от Aggregator)
+    ADMIN_BOT_API_HOST = os.getenv("ADMIN_BOT_API_HOST", "localhost")
+    ADMIN_BOT_API_PORT = int(os.getenv("ADMIN_BOT_API_PORT", "8001"))
+    ADMIN_BOT_API_URL = f"http://{ADMIN_BOT_API_HOST}:{ADMIN_BOT_API_PORT}"
+
+    # Admin Bot: режим получения апдейтов и хранилище FSM
+    ADMIN_BOT_USE_WEBHOOK = os.getenv("ADMIN_BOT_USE_WEBHOOK", "false").lower() in ("1", "true", "yes")
+    WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL") # Публичный адрес балансировщика, например https://bot.example.com
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") # Проверяется по заголовку X-Telegram-Bot-Api-Secret-Token
+    FSM_STORAGE = os.getenv("FSM_STORAGE", "memory") # memory | redis (redis нужен для нескольких реплик)
+    TELEGRAM_API_SERVER = os.getenv("TELEGRAM_API_SERVER") # Локальный Bot API сервер или заглушка, например http://localhost:8081
+    ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN") # Authorization: Bearer <token> для внутреннего API; обязателен в режиме webhook
+
+    # Aggregator settings
+    INITIAL_QUESTION_TEXT = os.getenv(
+        "INITIAL_QUESTION_TEXT",
+        "Здравствуйте! Подскажите, вы собственник квартиры или агент?",
+    )
+    OWNER_KEYWORDS = [
+        "собственник",
+        "хозяин",
+        "я",
+        "мой",
+        "мое",
+        "напрямую",
+        "сам",
+        "без посредников",
+    ]
+    AGENT_KEYWORDS = ["агент", "посредник", "риелтор", "брокер", "не я", "нет"]
+    CHANNEL_FILTER_KEYWORDS = [
+        "продажа",
+        "квартира",
+        "м²",
+        "цена",
+        "руб",
+        "собственник",
+        "без комиссии",
+    ]
+
+    # Anti-ban settings
+    DM_SEND_INTERVAL_MIN = int(os.getenv("DM_SEND_INTERVAL_MIN", "5")) # Минимальная задержка между DM в секундах
+    DM_SEND_INTERVAL_MAX = int(os.getenv("DM_SEND_INTERVAL_MAX", "15")) # Максимальная задержка между DM в секундах
+    DAILY_DM_LIMIT_PER_ACCOUNT = int(os.getenv("DAILY_DM_LIMIT_PER_ACCOUNT", "50")) # Дневной лимит DM с одного аккаунта
+
+    # Profiling (см. profiling.py); endpoint'ы /debug требуют ADMIN_API_TOKEN
+    PROFILING_SLOW_CALLBACK_MS = int(os.getenv("PROFILING_SLOW_CALLBACK_MS", "100")) # Порог блокировки event loop
+    AGGREGATOR_DEBUG_HOST = os.getenv("AGGREGATOR_DEBUG_HOST", "localhost")
+    AGGREGATOR_DEBUG_PORT = int(os.getenv("AGGREGATOR_DEBUG_PORT", "0")) # 0 - debug API агрегатора не запускается
+    AGGREGATOR_DEBUG_URL = f"http://{AGGREGATOR_DEBUG_HOST}:{AGGREGATOR_DEBUG_PORT}"
+
+    # Копия: под трассировщиком (отладчик, coverage) locals() меняется прямо во время обхода
+    for name, value in dict(locals()).items():
+        if name.isupper():
+            globals().setdefault(name, value)
+    _loaded = True
+
+
+def __getattr__(name):
+    if not _loaded and name.isupper():
+        load()
+        if name in globals():
+            return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
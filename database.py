@@ -56,7 +56,12 @@ class TelegramMessage(Base):
     last_dialog_attempt = Column(DateTime, nullable=True)
 
     channel = relationship("Channel", back_populates="messages")
-    user = relationship("TelegramUser", back_populates="messages", uselist=False)
+    user = relationship(
+        "TelegramUser",
+        back_populates="messages",
+        uselist=False,
+        primaryjoin="TelegramUser.telegram_id == foreign(TelegramMessage.author_telegram_id)",
+    )
 
 
 class TelegramUser(Base):
@@ -77,7 +82,11 @@ class TelegramUser(Base):
         DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
     )
 
-    messages = relationship("TelegramMessage", back_populates="user")
+    messages = relationship(
+        "TelegramMessage",
+        back_populates="user",
+        primaryjoin="TelegramUser.telegram_id == foreign(TelegramMessage.author_telegram_id)",
+    )
 
 class Setting(Base):
     __tablename__ = "settings"
@@ -87,11 +96,31 @@ class Setting(Base):
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
 
-engine = create_engine(config.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine = None
+
+def init_engine(url: str | None = None, **kwargs):
+    """Создает engine (по умолчанию для config.DATABASE_URL) и привязывает к нему SessionLocal."""
+    global _engine
+    _engine = create_engine(url or config.DATABASE_URL, **kwargs)
+    SessionLocal.configure(bind=_engine)
+    return _engine
+
+def get_engine():
+    """Engine создается при первом обращении, а не при импорте модуля."""
+    if _engine is None:
+        init_engine()
+    return _engine
+
+class _LazySessionMaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if "bind" not in local_kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
 
 def create_db_and_tables():
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
     print("Database tables created/checked.")
 
 def get_db():
@@ -0,0 +1,293 @@
+"""
+Выгрузка объявлений и их авторов (telegram_messages + telegram_users) в CSV, JSONL или Parquet.
+
+Строки читаются серверным курсором (yield_per) и пишутся пачками, поэтому память не растет
+с размером выгрузки. Порядок - по telegram_messages.id, так что прерванную выгрузку можно
+продолжить с --after-id <последний записанный id> (его выводит CLI): CSV/JSONL дописываются
+в тот же файл, Parquet пишется в отдельный файл-часть.
+
+Пример:
+    python -m export --format csv --status OWNER --since 2024-01-01 -o owners.csv
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from database import SessionLocal, TelegramMessage, TelegramUser
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+DEFAULT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    TelegramMessage.id,
+    TelegramMessage.channel_id,
+    TelegramMessage.message_id,
+    TelegramMessage.author_telegram_id,
+    TelegramMessage.author_username,
+    TelegramUser.username,
+    TelegramUser.first_name,
+    TelegramUser.last_name,
+    TelegramUser.is_owner_confirmed,
+    TelegramMessage.owner_status,
+    TelegramMessage.is_relevant,
+    TelegramMessage.message_text,
+    TelegramMessage.original_link,
+    TelegramMessage.processed_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def iter_export_rows(
+    db,
+    statuses: list[str] | None = None,
+    channel_ids: list[int] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after_id: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """Отдает строки выгрузки по одной, в порядке возрастания telegram_messages.id."""
+    query = db.query(*EXPORT_COLUMNS).outerjoin(
+        TelegramUser, TelegramUser.telegram_id == TelegramMessage.author_telegram_id
+    )
+    if statuses:
+        query = query.filter(TelegramMessage.owner_status.in_(statuses))
+    if channel_ids:
+        query = query.filter(TelegramMessage.channel_id.in_(channel_ids))
+    if since:
+        query = query.filter(TelegramMessage.processed_at >= since)
+    if until:
+        query = query.filter(TelegramMessage.processed_at < until)
+    if after_id is not None:
+        query = query.filter(TelegramMessage.id > after_id)
+
+    # yield_per включает stream_results: на PostgreSQL это серверный курсор
+    for row in query.order_by(TelegramMessage.id).yield_per(batch_size):
+        yield dict(zip(EXPORT_FIELDS, row))
+
+
+def _batched(rows: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _iter_csv(batches: Iterable[list[dict]], header: bool = True) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    if header:
+        writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8") # Только заголовок, если строк нет
+
+
+def _iter_jsonl(batches: Iterable[list[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in batch
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файлоподобный приемник для ParquetWriter, из которого записанные байты забираются по частям."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_parquet(batches: Iterable[list[dict]]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("channel_id", pa.int64()),
+        ("message_id", pa.int64()),
+        ("author_telegram_id", pa.int64()),
+        ("author_username", pa.string()),
+        ("username", pa.string()),
+        ("first_name", pa.string()),
+        ("last_name", pa.string()),
+        ("is_owner_confirmed", pa.bool_()),
+        ("owner_status", pa.string()),
+        ("is_relevant", pa.bool_()),
+        ("message_text", pa.string()),
+        ("original_link", pa.string()),
+        ("processed_at", pa.timestamp("us")),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        # Каждая пачка - отдельная row group, после нее готовые байты сразу отдаются наружу
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _serialize_batches(batches: Iterable[list[dict]], fmt: str, header: bool = True) -> Iterator[bytes]:
+    """
+    Отдает ровно один кусок байтов на каждую пачку, прежде чем взять следующую
+    (плюс, возможно, завершающий кусок: заголовок CSV без строк или футер Parquet).
+    """
+    if fmt == "csv":
+        return _iter_csv(batches, header)
+    if fmt == "jsonl":
+        return _iter_jsonl(batches)
+    if fmt == "parquet":
+        return _iter_parquet(batches)
+    raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+
+def iter_export_chunks(
+    rows: Iterable[dict], fmt: str, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Сериализует строки в выбранный формат, отдавая байты по одной пачке за раз."""
+    return _serialize_batches(_batched(rows, batch_size), fmt)
+
+
+def stream_export(fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, **filters) -> Iterator[bytes]:
+    """Открывает свою сессию БД и держит ее, пока выгрузка не будет дочитана или прервана."""
+    db = SessionLocal()
+    try:
+        rows = iter_export_rows(db, batch_size=batch_size, **filters)
+        yield from iter_export_chunks(rows, fmt, batch_size)
+    finally:
+        db.close()
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _resume_path(output: str, after_id: int) -> str:
+    stem, dot, suffix = output.rpartition(".")
+    return f"{stem}.after-{after_id}.{suffix}" if dot else f"{output}.after-{after_id}"
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Export listings and their authors")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("-o", "--output", help="Output file (stdout if omitted)")
+    parser.add_argument("--status", action="append", dest="statuses", help="owner_status filter, repeatable (e.g. OWNER)")
+    parser.add_argument("--channel", action="append", dest="channel_ids", type=int, help="Channel telegram_id filter, repeatable")
+    parser.add_argument("--since", type=_parse_date, help="processed_at >= this ISO date/datetime")
+    parser.add_argument("--until", type=_parse_date, help="processed_at < this ISO date/datetime")
+    parser.add_argument("--after-id", type=int, help="Resume after this telegram_messages.id (CSV/JSONL are appended to --output, Parquet goes to a separate part file)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    output = args.output
+    resuming = args.after_id is not None and output and os.path.exists(output)
+    if resuming and args.format == "parquet":
+        # Parquet нельзя дописать: продолжение пишется в отдельный файл-часть
+        output = _resume_path(output, args.after_id)
+        resuming = False
+
+    # last_id/exported двигаются только после того, как кусок с этими строками записан
+    last_id = args.after_id
+    exported = 0
+    pending_id = last_id
+    pending_exported = 0
+
+    def track(batches):
+        nonlocal pending_id, pending_exported
+        for batch in batches:
+            pending_id = batch[-1]["id"]
+            pending_exported += len(batch)
+            yield batch
+
+    db = SessionLocal()
+    out = open(output, "ab" if resuming else "wb") if output else sys.stdout.buffer
+    written_size = out.tell() if output else None
+    try:
+        rows = iter_export_rows(
+            db,
+            statuses=args.statuses,
+            channel_ids=args.channel_ids,
+            since=args.since,
+            until=args.until,
+            after_id=args.after_id,
+            batch_size=args.batch_size,
+        )
+        batches = track(_batched(rows, args.batch_size))
+        for chunk in _serialize_batches(batches, args.format, header=not resuming):
+            out.write(chunk)
+            out.flush()
+            if output:
+                written_size = out.tell()
+            if args.format != "parquet":
+                last_id, exported = pending_id, pending_exported
+        # Строки Parquet читаемы только после записи футера, то есть в самом конце
+        last_id, exported = pending_id, pending_exported
+    except BaseException:
+        if output and args.format == "parquet":
+            out.close()
+            os.remove(output) # Файл без футера не читается, продолжать надо с того же --after-id
+        elif output:
+            # Отрезаем недописанный кусок, чтобы продолжение с --after-id не дало битую строку
+            out.truncate(written_size)
+        raise
+    finally:
+        if output:
+            out.close()
+        db.close()
+        # Выводим, даже если выгрузка прервалась: это точка для --after-id
+        logger.info(f"Exported {exported} rows to {output or 'stdout'}, last written id: {last_id}")
+
+
+if __name__ == "__main__":
+    main()
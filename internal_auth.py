@@ -0,0 +1,22 @@
+import hmac
+from fastapi import Header, HTTPException
+import config
+
+
+def _token_matches(authorization: str | None) -> bool:
+    expected = f"Bearer {config.ADMIN_API_TOKEN}"
+    return hmac.compare_digest((authorization or "").encode(), expected.encode())
+
+
+async def verify_internal_token(authorization: str | None = Header(default=None)):
+    """Если задан ADMIN_API_TOKEN, endpoint требует заголовок Authorization: Bearer <token>."""
+    if config.ADMIN_API_TOKEN and not _token_matches(authorization):
+        raise HTTPException(status_code=401, detail="Invalid or missing internal API token")
+
+
+async def require_internal_token(authorization: str | None = Header(default=None)):
+    """Для чувствительных endpoints (выгрузка, профилирование) токен обязателен всегда."""
+    if not config.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="ADMIN_API_TOKEN is not configured")
+    if not _token_matches(authorization):
+        raise HTTPException(status_code=401, detail="Invalid or missing internal API token")
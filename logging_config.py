@@ -0,0 +1,13 @@
+import logging
+
+
+def setup_logging(log_file: str):
+    """Логирование сервиса в файл и в консоль. Вызывается из точки входа, а не при импорте."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler()
+        ]
+    )
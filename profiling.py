@@ -0,0 +1,293 @@
+"""
+Профилирование работающего процесса по запросу.
+
+- timed(): время выполнения хэндлеров (count/avg/max), пока профилирование включено;
+  waiting() выносит преднамеренные ожидания (rate limit, FloodWait) в отдельный ключ;
+- watchdog event loop: ловит коллбэки, блокирующие loop дольше порога, и логирует их стек
+  и полную длительность блокировки;
+- capture_samples() / capture_cprofile(): снимок на N секунд в collapsed-формате
+  (flamegraph.pl, speedscope) или в формате .prof (snakeviz, flameprof).
+
+Пока профилирование выключено, фоновых задач и потоков нет, а timed() сводится к одной проверке флага.
+"""
+import asyncio
+import contextlib
+import contextvars
+import cProfile
+import functools
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ("sample", "cprofile")
+MAX_CAPTURE_SECONDS = 300
+
+
+class _ProfilingState:
+    def __init__(self):
+        self.enabled = False
+        self.timings = {} # name -> [count, total_seconds, max_seconds]
+        self.slow_callbacks = deque(maxlen=50)
+        self.capture_lock = threading.Lock()
+        self._heartbeat_task = None
+        self._watchdog_stop = None
+
+
+_state = _ProfilingState()
+# Сколько секунд текущий timed()-вызов провел в waiting(); у каждой задачи asyncio свое значение
+_current_waits = contextvars.ContextVar("profiling_waits", default=None)
+
+
+def is_enabled() -> bool:
+    return _state.enabled
+
+
+def timed(name: str | None = None):
+    """Декоратор для async-хэндлеров: копит время выполнения, пока профилирование включено."""
+    def decorator(func):
+        key = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return await func(*args, **kwargs)
+            waits = [0.0]
+            token = _current_waits.set(waits)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _current_waits.reset(token)
+                _record(key, time.perf_counter() - started - waits[0])
+        return wrapper
+    return decorator
+
+
+@contextlib.asynccontextmanager
+async def waiting(name: str):
+    """
+    Преднамеренное ожидание внутри timed()-хэндлера (rate limit, пауза после FloodWait):
+    время пишется под ключом name и вычитается из времени хэндлера.
+    """
+    if not _state.enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _record(name, elapsed)
+        waits = _current_waits.get()
+        if waits is not None:
+            waits[0] += elapsed
+
+
+def _record(key: str, elapsed: float):
+    stats = _state.timings.setdefault(key, [0, 0.0, 0.0])
+    stats[0] += 1
+    stats[1] += elapsed
+    stats[2] = max(stats[2], elapsed)
+
+
+def get_timings() -> dict:
+    return {
+        key: {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "max_ms": round(maximum * 1000, 3),
+            "total_s": round(total, 3),
+        }
+        for key, (count, total, maximum) in _state.timings.items()
+    }
+
+
+def get_status() -> dict:
+    return {
+        "enabled": _state.enabled,
+        "slow_callback_threshold_ms": config.PROFILING_SLOW_CALLBACK_MS,
+        "timings": get_timings(),
+        "slow_callbacks": list(_state.slow_callbacks),
+    }
+
+
+def enable():
+    """Включает тайминги и watchdog event loop. Вызывать из потока event loop."""
+    if _state.enabled:
+        return
+    _state.enabled = True
+    _state.timings.clear()
+    _state.slow_callbacks.clear()
+    loop_thread_id = threading.get_ident()
+    last_beat = [time.monotonic()]
+    _state._heartbeat_task = asyncio.get_running_loop().create_task(_heartbeat(last_beat))
+    _state._watchdog_stop = threading.Event()
+    threading.Thread(
+        target=_watchdog, args=(loop_thread_id, last_beat, _state._watchdog_stop), name="loop-watchdog", daemon=True
+    ).start()
+    logger.info("Profiling enabled.")
+
+
+def disable():
+    if not _state.enabled:
+        return
+    _state.enabled = False
+    if _state._heartbeat_task:
+        _state._heartbeat_task.cancel()
+        _state._heartbeat_task = None
+    _state._watchdog_stop.set()
+    _state._watchdog_stop = None
+    logger.info("Profiling disabled.")
+
+
+async def _heartbeat(last_beat: list):
+    interval = config.PROFILING_SLOW_CALLBACK_MS / 1000 / 4
+    while True:
+        last_beat[0] = time.monotonic()
+        await asyncio.sleep(interval)
+
+
+def _watchdog(loop_thread_id: int, last_beat: list, stop: threading.Event):
+    """
+    Если heartbeat не обновлялся дольше порога, значит loop занят одним коллбэком - снимаем его стек.
+    Запись остается открытой (in_progress), пока heartbeat не вернется, и тогда blocked_ms - вся
+    длительность блокировки (с точностью до интервала heartbeat).
+    """
+    threshold = config.PROFILING_SLOW_CALLBACK_MS / 1000
+    blocked = None # (beat, запись) текущей блокировки
+    while not stop.wait(threshold / 4):
+        beat = last_beat[0]
+        if blocked is not None:
+            blocked_beat, entry = blocked
+            if beat == blocked_beat:
+                entry["blocked_ms"] = round((time.monotonic() - blocked_beat) * 1000, 1)
+                continue
+            # heartbeat вернулся: loop стоял между двумя ударами
+            entry["blocked_ms"] = round((beat - blocked_beat) * 1000, 1)
+            entry["in_progress"] = False
+            blocked = None
+            logger.warning(f"Event loop blocked for {entry['blocked_ms']:.0f} ms in: {' <- '.join(reversed(entry['stack'][-5:]))}")
+        blocked_for = time.monotonic() - beat
+        if blocked_for > threshold:
+            frame = sys._current_frames().get(loop_thread_id)
+            if frame is None:
+                continue # Поток event loop уже завершился
+            entry = {
+                "at": time.time(),
+                "blocked_ms": round(blocked_for * 1000, 1),
+                "in_progress": True,
+                "stack": _frame_stack(frame),
+            }
+            _state.slow_callbacks.append(entry)
+            blocked = (beat, entry)
+
+
+def _frame_stack(frame) -> list[str]:
+    """Стек от корня к текущему кадру в виде 'module:function:line'."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _sample_stacks(thread_id: int, seconds: float, interval: float) -> Counter:
+    samples = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            # Для flamegraph номера строк не нужны, иначе один и тот же вызов дробится
+            samples[";".join(item.rsplit(":", 1)[0] for item in _frame_stack(frame))] += 1
+        time.sleep(interval)
+    return samples
+
+
+async def capture_samples(seconds: float, interval_ms: float = 5) -> bytes:
+    """Семплирует стек потока event loop из отдельного потока. Возвращает collapsed stacks."""
+    loop_thread_id = threading.get_ident()
+    if not _state.capture_lock.acquire(blocking=False):
+        raise RuntimeError("Another capture is already running")
+    try:
+        samples = await asyncio.to_thread(_sample_stacks, loop_thread_id, seconds, interval_ms / 1000)
+    finally:
+        _state.capture_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common()).encode("utf-8")
+
+
+async def capture_cprofile(seconds: float) -> bytes:
+    """Профилирует поток event loop через cProfile. Возвращает содержимое .prof файла."""
+    if not _state.capture_lock.acquire(blocking=False):
+        raise RuntimeError("Another capture is already running")
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+    finally:
+        _state.capture_lock.release()
+    # Тот же формат, что пишет pstats.Stats.dump_stats
+    return marshal.dumps(pstats.Stats(profile).stats)
+
+
+async def capture(mode: str, seconds: float, interval_ms: float = 5) -> bytes:
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode: {mode!r} (expected one of {', '.join(CAPTURE_MODES)})")
+    if not 0 < seconds <= MAX_CAPTURE_SECONDS:
+        raise ValueError(f"seconds must be in (0, {MAX_CAPTURE_SECONDS}]")
+    if interval_ms <= 0:
+        raise ValueError("interval_ms must be positive")
+    if mode == "cprofile":
+        return await capture_cprofile(seconds)
+    return await capture_samples(seconds, interval_ms)
+
+
+def create_profiling_router(dependencies: list | None = None):
+    """
+    FastAPI-роутер с управлением профилированием (подключается к внутренним API).
+    dependencies применяются ко всем endpoint'ам - через них подключается проверка токена.
+    """
+    from fastapi import APIRouter, HTTPException
+    from fastapi.responses import Response
+
+    router = APIRouter(dependencies=dependencies or [])
+
+    @router.get("/profiling")
+    async def profiling_status_endpoint():
+        return get_status()
+
+    @router.post("/profiling/enable")
+    async def profiling_enable_endpoint():
+        enable()
+        return get_status()
+
+    @router.post("/profiling/disable")
+    async def profiling_disable_endpoint():
+        disable()
+        return get_status()
+
+    @router.post("/profiling/capture")
+    async def profiling_capture_endpoint(mode: str = "sample", seconds: float = 10, interval_ms: float = 5):
+        try:
+            dump = await capture(mode, seconds, interval_ms)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if mode == "cprofile":
+            return Response(dump, media_type="application/octet-stream", headers={"Content-Disposition": 'attachment; filename="profile.prof"'})
+        return Response(dump, media_type="text/plain; charset=utf-8", headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
+
+    return router
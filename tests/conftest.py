@@ -0,0 +1,57 @@
+import os
+from datetime import datetime, timezone
+
+# config читает окружение при первом обращении к настройке, поэтому оно задается заранее
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("ADMIN_CHAT_ID", "1")
+os.environ.setdefault("WEBHOOK_SECRET", "test-secret")
+os.environ.setdefault("ADMIN_API_TOKEN", "test-token")
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetFile, SendMessage
+from aiogram.types import Chat, File, Message
+from fastapi.testclient import TestClient
+
+import config
+from admin_bot_service import api, main
+
+
+class StubSession(BaseSession):
+    """Заглушка Bot API: запоминает вызовы и отвечает успехом, не ходя в сеть."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.files = {} # file_id -> содержимое для bot.download
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=len(self.requests),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        if isinstance(method, GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_path=f"documents/{method.file_id}")
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield self.files.get(url.rsplit("/", 1)[-1], b"")
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(scope="session")
+def webhook_client():
+    """Клиент админ-API с зарегистрированным webhook; ответы Bot API подменены заглушкой."""
+    session = StubSession()
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    app = api.create_app()
+    api.register_webhook(app, main.create_dispatcher(), bot)
+    with TestClient(app) as client:
+        yield client, session
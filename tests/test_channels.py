@@ -0,0 +1,262 @@
+import pytest
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendMessage
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import config
+from admin_bot_service import main
+from database import Base, Channel
+
+OTHER_ADMIN_ID = 2
+
+
+@pytest.fixture
+def channels_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'channels.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(main, "SessionLocal", session_factory)
+    return session_factory
+
+
+def _add_channels(session_factory, titles: list[str], is_active: bool = True):
+    db = session_factory()
+    start = db.query(Channel).count() + 1
+    for number, title in enumerate(titles, start):
+        db.add(Channel(telegram_id=-1000 - number, title=title, is_active=is_active))
+    db.commit()
+    db.close()
+
+
+def _statuses(session_factory) -> dict[str, bool]:
+    db = session_factory()
+    try:
+        return {channel.title: channel.is_active for channel in db.query(Channel)}
+    finally:
+        db.close()
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"Admin {user_id}"}
+
+
+def _chat() -> dict:
+    return {"id": config.ADMIN_CHAT_ID, "type": "group" if config.ADMIN_CHAT_ID < 0 else "private"}
+
+
+class BotDriver:
+    """Шлет апдейты через /telegram/webhook и разбирает, что бот ответил."""
+
+    def __init__(self, client, session, user_id=None):
+        self.client, self.session = client, session
+        self.user_id = user_id or config.ADMIN_CHAT_ID
+        self.update_id = 1000
+
+    def _post(self, update: dict):
+        self.update_id += 1
+        self.session.requests.clear()
+        response = self.client.post(
+            config.WEBHOOK_PATH,
+            json={"update_id": self.update_id, **update},
+            headers={"X-Telegram-Bot-Api-Secret-Token": config.WEBHOOK_SECRET},
+        )
+        assert response.status_code == 200
+
+    def send(self, text: str | None = None, document: dict | None = None):
+        message = {"message_id": self.update_id, "date": 0, "chat": _chat(), "from": _user(self.user_id)}
+        if text is not None:
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if document is not None:
+            message["document"] = document
+        self._post({"message": message})
+
+    def press(self, data: str, chat: dict | None = None):
+        self._post({"callback_query": {
+            "id": str(self.update_id),
+            "from": _user(self.user_id),
+            "chat_instance": "1",
+            "data": data,
+            "message": {"message_id": 1, "date": 0, "chat": chat or _chat(), "text": "..."},
+        }})
+
+    @property
+    def screen(self):
+        """Последнее отправленное или отредактированное сообщение."""
+        return [m for m in self.session.requests if isinstance(m, (SendMessage, EditMessageText))][-1]
+
+    @property
+    def alert(self) -> str | None:
+        answers = [m for m in self.session.requests if isinstance(m, AnswerCallbackQuery)]
+        return answers[-1].text if answers else None
+
+    def buttons(self, prefix: str) -> list[str]:
+        markup = self.screen.reply_markup
+        return [
+            button.callback_data
+            for row in (markup.inline_keyboard if markup else [])
+            for button in row
+            if button.callback_data.startswith(prefix)
+        ]
+
+    def listed_titles(self) -> list[str]:
+        """Каналы страницы в порядке кнопок переключения."""
+        return [
+            button.text.split(" ", 1)[1].rsplit(" (", 1)[0]
+            for row in self.screen.reply_markup.inline_keyboard
+            for button in row
+            if button.callback_data.startswith("chtgl:")
+        ]
+
+
+@pytest.fixture
+def bot_driver(webhook_client):
+    return BotDriver(*webhook_client)
+
+
+def test_parse_channel_ids_accepts_only_whole_integers():
+    raw_text = "-1001, 1002\nhttps://t.me/c/1003 @chan2024 -1001 12ab"
+
+    telegram_ids, rejected = main._parse_channel_ids(raw_text)
+
+    assert telegram_ids == [-1001, 1002]
+    assert rejected == ["https://t.me/c/1003", "@chan2024", "12ab"]
+
+
+def test_keyset_paging_forward_and_back(bot_driver, channels_db):
+    _add_channels(channels_db, [f"Канал {number:02}" for number in range(1, 46)])
+
+    bot_driver.send("/channels")
+    assert bot_driver.listed_titles() == [f"Канал {number:02}" for number in range(1, 21)]
+    assert bot_driver.buttons("chprev:") == []
+
+    bot_driver.press(bot_driver.buttons("chpage:")[0])
+    assert bot_driver.listed_titles() == [f"Канал {number:02}" for number in range(21, 41)]
+
+    bot_driver.press(bot_driver.buttons("chpage:")[0])
+    assert bot_driver.listed_titles() == [f"Канал {number:02}" for number in range(41, 46)]
+    assert bot_driver.buttons("chpage:") == []
+
+    bot_driver.press(bot_driver.buttons("chprev:")[0])
+    assert bot_driver.listed_titles() == [f"Канал {number:02}" for number in range(21, 41)]
+
+
+def test_search_by_title_and_by_id(bot_driver, channels_db):
+    _add_channels(channels_db, ["Москва квартиры", "Питер квартиры", "Москва новостройки"])
+
+    bot_driver.send("/channels Москва")
+    assert bot_driver.listed_titles() == ["Москва квартиры", "Москва новостройки"]
+
+    bot_driver.send("/channels -1002")
+    assert bot_driver.listed_titles() == ["Питер квартиры"]
+
+
+def test_filter_keeps_search(bot_driver, channels_db):
+    _add_channels(channels_db, ["Москва 1", "Питер 1"])
+    _add_channels(channels_db, ["Москва 2"], is_active=False)
+
+    bot_driver.send("/channels Москва")
+    bot_driver.press(next(data for data in bot_driver.buttons("chflt:") if data.startswith("chflt:inactive:")))
+
+    assert bot_driver.listed_titles() == ["Москва 2"]
+
+
+def test_toggle_rerenders_same_page(bot_driver, channels_db):
+    _add_channels(channels_db, [f"Канал {number:02}" for number in range(1, 31)])
+    bot_driver.send("/channels")
+    bot_driver.press(bot_driver.buttons("chpage:")[0])
+    page = bot_driver.listed_titles()
+
+    bot_driver.press(bot_driver.buttons("chtgl:")[3])
+
+    assert isinstance(bot_driver.screen, EditMessageText)
+    assert bot_driver.listed_titles() == page
+    assert _statuses(channels_db)["Канал 24"] is False
+    assert "🔴 <code>-1024</code>" in bot_driver.screen.text
+
+
+def test_bulk_confirm_uses_confirmed_scope(bot_driver, channels_db):
+    _add_channels(channels_db, ["Москва 1", "Москва 2", "Питер 1"])
+    bot_driver.send("/channels Москва")
+    bot_driver.press(bot_driver.buttons("chbulk:off:")[0])
+    confirm = bot_driver.buttons("chbulk:off:confirm:")
+    assert len(confirm) == 1 and confirm[0].endswith(":2")
+    assert _statuses(channels_db) == {"Москва 1": True, "Москва 2": True, "Питер 1": True}
+
+    # Админ ушел в общий список, потом нажал старую кнопку подтверждения
+    bot_driver.send("/channels")
+    bot_driver.press(confirm[0])
+
+    assert _statuses(channels_db) == {"Москва 1": False, "Москва 2": False, "Питер 1": True}
+
+
+def test_bulk_confirm_rechecks_count(bot_driver, channels_db):
+    _add_channels(channels_db, ["Москва 1", "Москва 2"])
+    bot_driver.send("/channels")
+    bot_driver.press(bot_driver.buttons("chbulk:off:")[0])
+    confirm = bot_driver.buttons("chbulk:off:confirm:")[0]
+    _add_channels(channels_db, ["Москва 3"])
+
+    bot_driver.press(confirm)
+
+    assert set(_statuses(channels_db).values()) == {True}
+    assert bot_driver.alert == "Список каналов изменился, подтвердите еще раз."
+    assert bot_driver.buttons("chbulk:off:confirm:")[0].endswith(":3")
+
+
+def test_other_group_admin_sees_button_scope(bot_driver, channels_db, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_CHAT_ID", -100)
+    _add_channels(channels_db, ["Москва 1", "Москва 2", "Питер 1"])
+    bot_driver.send("/channels Москва")
+    toggle = bot_driver.buttons("chtgl:")[0]
+
+    other_admin = BotDriver(bot_driver.client, bot_driver.session, user_id=OTHER_ADMIN_ID)
+    other_admin.press(toggle)
+
+    assert other_admin.listed_titles() == ["Москва 1", "Москва 2"]
+    assert _statuses(channels_db)["Москва 1"] is False
+
+
+@pytest.mark.parametrize("chat_id, user_id", [(999, 999), (1, OTHER_ADMIN_ID)])
+def test_callbacks_outside_admin_chat_are_rejected(bot_driver, channels_db, chat_id, user_id):
+    _add_channels(channels_db, ["Москва 1"])
+    intruder = BotDriver(bot_driver.client, bot_driver.session, user_id=user_id)
+
+    for data in ["chbulk:off:confirm:all::1", "chtgl:-1001:0:all:", "chimport"]:
+        intruder.press(data, chat={"id": chat_id, "type": "private"})
+        assert intruder.alert == "Извините, этот бот предназначен только для администраторов."
+
+    assert _statuses(channels_db) == {"Москва 1": True}
+
+
+def test_old_format_button_is_answered_as_stale(bot_driver, channels_db):
+    _add_channels(channels_db, ["Москва 1"])
+
+    bot_driver.press("chbulk:off:confirm")
+
+    assert bot_driver.alert == "Кнопка устарела, откройте /channels заново."
+    assert _statuses(channels_db) == {"Москва 1": True}
+
+
+def test_bulk_import_from_text(bot_driver, channels_db):
+    _add_channels(channels_db, ["Существующий"])
+
+    bot_driver.press("chimport")
+    bot_driver.send("-5001, -5002\n@bad_channel -1001")
+
+    report = [m.text for m in bot_driver.session.requests if isinstance(m, SendMessage)][0]
+    assert "добавлено 2, уже были в базе 1" in report
+    assert "<code>@bad_channel</code>" in report
+    assert set(_statuses(channels_db)) == {"Существующий", "Канал -5001", "Канал -5002"}
+
+
+def test_bulk_import_from_file(bot_driver, channels_db):
+    bot_driver.session.files["import-ids"] = b"-6001\n-6002\n-6001\n"
+
+    bot_driver.press("chimport")
+    bot_driver.send(document={"file_id": "import-ids", "file_unique_id": "import-ids", "file_size": 18})
+
+    report = [m.text for m in bot_driver.session.requests if isinstance(m, SendMessage)][0]
+    assert "добавлено 2, уже были в базе 0" in report
+    assert set(_statuses(channels_db)) == {"Канал -6001", "Канал -6002"}
@@ -0,0 +1,176 @@
+import asyncio
+import marshal
+import pstats
+import re
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import config
+import profiling
+from admin_bot_service import api
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/debug/profiling"),
+    ("post", "/debug/profiling/enable"),
+    ("post", "/debug/profiling/capture"),
+])
+def test_profiling_endpoints_require_token(method, path):
+    client = TestClient(api.create_app())
+
+    assert client.request(method, path).status_code == 401
+    assert client.request(method, path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_profiling_disabled_without_configured_token(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_API_TOKEN", None)
+    client = TestClient(api.create_app())
+
+    assert client.get("/debug/profiling", headers={"Authorization": "Bearer None"}).status_code == 403
+
+
+def test_profiling_status_with_token():
+    client = TestClient(api.create_app())
+
+    response = client.get("/debug/profiling", headers={"Authorization": f"Bearer {config.ADMIN_API_TOKEN}"})
+
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+@pytest.fixture
+def fast_watchdog(monkeypatch):
+    monkeypatch.setattr(config, "PROFILING_SLOW_CALLBACK_MS", 40)
+
+
+def _watchdog_threads() -> list[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name == "loop-watchdog"]
+
+
+async def _busy_worker(stop: asyncio.Event):
+    """
+    Держит loop занятым блокирующими кусками, чтобы их было видно в профиле. Кусок длиннее
+    switch interval GIL (5 мс), иначе семплер получает GIL только на select() между кусками.
+    """
+    while not stop.is_set():
+        deadline = time.perf_counter() + 0.02
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(0)
+
+
+async def _capture_while_busy(mode: str) -> bytes:
+    stop = asyncio.Event()
+    worker = asyncio.create_task(_busy_worker(stop))
+    try:
+        return await profiling.capture(mode, 0.3)
+    finally:
+        stop.set()
+        await worker
+
+
+def test_timed_counts_only_while_enabled(fast_watchdog):
+    @profiling.timed("sleepy")
+    async def sleepy():
+        await asyncio.sleep(0.02)
+
+    async def scenario():
+        await sleepy() # выключено - не считается
+        profiling.enable()
+        try:
+            for _ in range(3):
+                await sleepy()
+        finally:
+            profiling.disable()
+        await sleepy()
+
+    asyncio.run(scenario())
+
+    stats = profiling.get_timings()["sleepy"]
+    assert stats["count"] == 3
+    assert stats["max_ms"] >= 20
+
+
+def test_waiting_is_excluded_from_handler_time(fast_watchdog):
+    @profiling.timed("throttled_handler")
+    async def throttled_handler():
+        async with profiling.waiting("throttle_wait"):
+            await asyncio.sleep(0.2)
+        await asyncio.sleep(0.02)
+
+    async def scenario():
+        profiling.enable()
+        try:
+            await throttled_handler()
+        finally:
+            profiling.disable()
+
+    asyncio.run(scenario())
+
+    timings = profiling.get_timings()
+    assert 20 <= timings["throttled_handler"]["max_ms"] < 150
+    assert timings["throttle_wait"]["max_ms"] >= 200
+
+
+def test_watchdog_reports_full_block_duration(fast_watchdog):
+    def block_the_loop():
+        time.sleep(0.5)
+
+    async def scenario():
+        profiling.enable()
+        try:
+            await asyncio.sleep(0.05)
+            block_the_loop()
+            # Даем heartbeat вернуться, а watchdog - закрыть запись
+            await asyncio.sleep(0.1)
+        finally:
+            profiling.disable()
+
+    asyncio.run(scenario())
+
+    [event] = profiling.get_status()["slow_callbacks"]
+    assert event["in_progress"] is False
+    assert 500 <= event["blocked_ms"] < 600
+    assert any(":block_the_loop:" in frame for frame in event["stack"])
+
+
+def test_enable_disable_leave_no_task_or_thread(fast_watchdog):
+    async def scenario():
+        profiling.enable()
+        assert len(_watchdog_threads()) == 1
+        assert len(asyncio.all_tasks()) == 2 # текущая задача + heartbeat
+        profiling.disable()
+        await asyncio.sleep(0) # отмененный heartbeat завершается на следующем шаге loop
+        return len(asyncio.all_tasks())
+
+    assert asyncio.run(scenario()) == 1
+    deadline = time.monotonic() + 1
+    while _watchdog_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _watchdog_threads() == []
+    assert not profiling.is_enabled()
+
+
+def test_capture_sample_returns_collapsed_stacks():
+    dump = asyncio.run(_capture_while_busy("sample")).decode()
+
+    lines = dump.splitlines()
+    assert lines
+    # Формат flamegraph.pl/speedscope: кадры через ";", число семплов после последнего пробела
+    stacks = [line.rsplit(" ", 1) for line in lines]
+    assert all(re.fullmatch(r"\d+", count) and "" not in stack.split(";") for stack, count in stacks)
+    assert any("test_profiling.py:_busy_worker" in stack.split(";") for stack, _ in stacks)
+
+
+def test_capture_cprofile_loads_with_pstats(tmp_path):
+    dump = asyncio.run(_capture_while_busy("cprofile"))
+    path = tmp_path / "aggregator.prof"
+    path.write_bytes(dump)
+
+    stats = pstats.Stats(str(path))
+
+    assert any(function == "_busy_worker" for _, _, function in stats.stats)
+    assert marshal.loads(dump) == stats.stats
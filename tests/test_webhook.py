@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.methods import SendMessage
+
+import config
+from admin_bot_service import main
+
+
+def _command_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": config.ADMIN_CHAT_ID, "type": "private"},
+            "from": {"id": config.ADMIN_CHAT_ID, "is_bot": False, "first_name": "Admin"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        },
+    }
+
+
+def test_webhook_feeds_update_to_dispatcher(webhook_client):
+    client, session = webhook_client
+    session.requests.clear()
+
+    response = client.post(
+        config.WEBHOOK_PATH,
+        json=_command_update(1, "/start"),
+        headers={"X-Telegram-Bot-Api-Secret-Token": config.WEBHOOK_SECRET},
+    )
+
+    assert response.status_code == 200
+    sent = [method for method in session.requests if isinstance(method, SendMessage)]
+    assert len(sent) == 1
+    assert sent[0].chat_id == config.ADMIN_CHAT_ID
+
+
+@pytest.mark.parametrize("secret", [None, "wrong-secret"])
+def test_webhook_rejects_missing_or_wrong_secret(webhook_client, secret):
+    client, session = webhook_client
+    session.requests.clear()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+
+    response = client.post(config.WEBHOOK_PATH, json=_command_update(2, "/start"), headers=headers)
+
+    assert response.status_code == 403
+    assert session.requests == []
+
+
+def test_notify_owner_requires_internal_token(webhook_client):
+    client, _ = webhook_client
+    payload = {"message_text": "Продам квартиру", "author_id": 42, "owner_status": "OWNER"}
+
+    assert client.post("/notify_owner", json=payload).status_code == 401
+    assert client.post("/notify_owner", json=payload, headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_webhook_mode_requires_secret(monkeypatch):
+    monkeypatch.setattr(config, "WEBHOOK_BASE_URL", "https://bot.example.com")
+    monkeypatch.setattr(config, "WEBHOOK_SECRET", None)
+
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        asyncio.run(main.run_webhook(Bot(token=config.BOT_TOKEN), main.create_dispatcher()))
+
+
+def test_create_dispatcher_can_be_called_repeatedly():
+    first, second = main.create_dispatcher(), main.create_dispatcher()
+
+    assert first.sub_routers[0] is not second.sub_routers[0]
+    assert first.resolve_used_update_types() == second.resolve_used_update_types()